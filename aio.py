@@ -0,0 +1,108 @@
+import asyncio
+import atexit
+import threading
+
+from flask import g
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Async read path.
+#
+# With ASYNC_READS set, the read routes run their statements on an async
+# engine (asyncpg on Postgres, aiosqlite on SQLite) instead of the sync
+# session. The engine lives on one event loop in a background thread shared by
+# all request threads, so its pooled connections are reused across requests,
+# and statements a page needs independently of each other (a detail page's
+# entity, genres and shows) run concurrently on separate connections rather
+# than one round trip after another. Views stay sync; they hand statements to
+# the loop and wait for the rows.
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_url(url):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'no async driver configured for {backend}')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+def _engine_options(options, statement_timeout):
+    options = {key: value for key, value in options.items() if key != 'connect_args'}
+    if statement_timeout:
+        # asyncpg takes server settings rather than a libpq options string
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(statement_timeout)}}
+    return options
+
+
+class AsyncReads:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.loop = None
+        self.primary = None
+        self.replica = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASYNC_READS', False)
+        app.extensions['async_reads'] = self
+        self.enabled = app.config['ASYNC_READS']
+        if not self.enabled:
+            return
+
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name='async-reads', daemon=True).start()
+        self.primary = self._create_engine(app, app.config['SQLALCHEMY_DATABASE_URI'],
+                                           app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        replica = app.config.get('SQLALCHEMY_BINDS', {}).get('replica')
+        if replica:
+            replica = dict(replica)
+            self.replica = self._create_engine(app, replica.pop('url'), replica,
+                                               query_only=app.config.get('SQLITE_READ_POOL', False))
+        atexit.register(self.close)
+
+    def _create_engine(self, app, url, options, query_only=False):
+        url = async_url(url)
+        timeout = app.config.get('DB_STATEMENT_TIMEOUT_MS') if url.get_backend_name() == 'postgresql' else None
+        engine = create_async_engine(url, **_engine_options(options, timeout))
+        # The embedded SQLite pragmas, when enabled; see embedded.py
+        embedded = app.extensions.get('embedded_sqlite')
+        if embedded is not None and embedded.enabled:
+            embedded.tune(engine.sync_engine, query_only=query_only)
+        return engine
+
+    def _engine(self):
+        # Same routing as the sync session; see replicas.py
+        return self.replica if self.replica is not None and g.get('db_replica') else self.primary
+
+    def fetch(self, *statements):
+        # Rows of each statement, run concurrently, one connection apiece
+        engine = self._engine()
+
+        async def run(statement):
+            async with engine.connect() as conn:
+                return (await conn.execute(statement)).all()
+
+        async def run_all():
+            return await asyncio.gather(*[run(statement) for statement in statements])
+
+        return asyncio.run_coroutine_threadsafe(run_all(), self.loop).result()
+
+    def all(self, query):
+        # Drop-in for Query.all() on a legacy query
+        return self.fetch(query.statement)[0]
+
+    def close(self):
+        engines = [engine for engine in (self.primary, self.replica) if engine is not None]
+
+        async def dispose():
+            for engine in engines:
+                await engine.dispose()
+
+        if self.loop is not None and self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(dispose(), self.loop).result(timeout=5)
+            self.loop.call_soon_threadsafe(self.loop.stop)
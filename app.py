@@ -2,27 +2,53 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+import click
+import hmac
 import json
 import sys
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
+from itertools import groupby
 import dateutil.parser
-import babel
+import babel.dates
 from flask import (
   Flask,
+  abort,
   render_template,
   request,
   Response,
   flash,
-  redirect, url_for
+  redirect, url_for,
+  jsonify
 )
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
 from forms import *
 from flask_migrate import Migrate
-from models import db, Venue, Artist, Show, VenueGenre, ArtistGenre
+from models import db, Venue, Artist, Show, Genre, VenueGenre, ArtistGenre, VersionStamp
+import search
+import fulltext
+from profiler import SQLProfiler
+from cache import PageCache
+from pagination import Page, keyset_query, paginate
+import importer
+import counters
+import facets
+import purge
+import scheduling
+from streaming import stream_page, stream_rows
+import versions
+from versions import ConditionalGet
+from assets import AssetBuilder, Assets
+from replicas import ReplicaRouter
+from aio import AsyncReads
+from feed import HomeFeed
+from embedded import EmbeddedSQLite
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -32,29 +58,100 @@ app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
 db.init_app(app)
+embedded_sqlite = EmbeddedSQLite(app)
 migrate = Migrate(app, db)
+profiler = SQLProfiler(app)
+page_cache = PageCache(app)
+assets = Assets(app)
+conditional_get = ConditionalGet(app)
+replicas = ReplicaRouter(app)
+async_reads = AsyncReads(app)
+home_feed = HomeFeed(app)
 app.app_context().push()
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
+DATETIME_FORMATS = {
+  'full': "EEEE MMMM, d, y 'at' h:mma",
+  'medium': "EE MM, dd, y h:mma",
+}
+
+@lru_cache(maxsize=64)
+def datetime_pattern(format, locale):
+  # Compile each pattern and resolve each locale once per process rather than
+  # on every call as babel.dates.format_datetime does
+  return babel.dates.parse_pattern(DATETIME_FORMATS.get(format, format)), babel.Locale.parse(locale)
+
+def format_datetime(value, format='medium', locale='en'):
+  # Views pass datetimes straight from the database; strings still parse
+  if isinstance(value, str):
+    value = dateutil.parser.parse(value)
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(value, locale)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+def facet_url(filters, **changes):
+  # The current listing with filters changed; None drops a filter. Paging
+  # starts over.
+  args = {**request.view_args, **filters, **changes}
+  return url_for(request.endpoint, **{name: value for name, value in args.items() if value is not None})
+
+app.jinja_env.globals['facet_url'] = facet_url
+
+#----------------------------------------------------------------------------#
+# Genres.
+#----------------------------------------------------------------------------#
+
+# genre name -> id, read from the genre lookup table and read again when its
+# 'genres' version stamp moves, e.g. after flask import-data added genres
+genre_ids = {}
+genres_version = None
+
+def load_genres():
+  global genres_version
+  version = db.session.scalar(select(VersionStamp.version).where(VersionStamp.key == 'genres')) or 0
+  if genre_ids and version == genres_version:
+    return
+  # Genres are only ever added, so the lookup is updated in place
+  genres = db.session.query(Genre.name, Genre.id).order_by(Genre.id).all()
+  genre_ids.update(genres)
+  set_genre_choices([name for name, _ in genres])
+  genres_version = version
+
+def uses_genres(view):
+  # For views reading genre_ids or the genre form choices
+  @wraps(view)
+  def wrapper(*args, **kwargs):
+    load_genres()
+    return view(*args, **kwargs)
+  return wrapper
+
+def sync_genres(genres, genre_model, names):
+  # Bring an entity's genre rows in line with the submitted names, inserting
+  # only the added genres and deleting (via delete-orphan) only the removed ones
+  wanted = {genre_ids[name] for name in names}
+  for genre in [genre for genre in genres if genre.genre_id not in wanted]:
+    genres.remove(genre)
+  current = {genre.genre_id for genre in genres}
+  genres.extend(genre_model(genre_id=genre_id) for genre_id in wanted - current)
+
+def read_all(query):
+  # Query.all() for the read routes, on the async engine with ASYNC_READS
+  if async_reads.enabled:
+    return async_reads.all(query)
+  return query.all()
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
 @app.route('/')
+@replicas.reads
 def index():
+  # The feed is rendered from home_feed (feed.py), as on every page using home.html
   return render_template('pages/home.html')
 
 
@@ -62,57 +159,155 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@replicas.reads
+@conditional_get.conditional(lambda: ['venues'])
+@page_cache.cached('venues')
 def venues():
-  # Query all distinct city/state pairs
-  areas = Venue.query.with_entities(Venue.city, Venue.state).distinct().all()
-
-  data = []
-
-  # For each city/state pair
-  for area in areas:
-    city, state = area
-
-    # Query the venues in this city/state
-    venues = Venue.query.filter_by(city=city, state=state).all()
-
-    # Add the city/state and venues to the data
-    data.append({
-      "city": city,
-      "state": state,
-      "venues": [{
-        "id": venue.id,
-        "name": venue.name,
-      } for venue in venues]
-    })
-
-  return render_template('pages/venues.html', areas=data)
+  # ?state=, ?city= and ?genre= narrow the listing; the facet counts beside it
+  # are for the venues it lists
+  filters = facets.from_args(request.args)
+  counts = facet_counts(Venue, filters)
+  if app.config['STREAM_LISTINGS']:
+    # Every area, grouped lazily as rows arrive from the cursor
+    rows = stream_rows(facets.apply(db.session.query(Venue.id, Venue.name, Venue.city, Venue.state), Venue, filters)
+                       .order_by(Venue.state, Venue.city, Venue.name, Venue.id),
+                       app.config['STREAM_BATCH_SIZE'])
+    areas = ({"city": city, "state": state, "venues": area_venues}
+             for (state, city), area_venues in groupby(rows, key=lambda row: (row.state, row.city)))
+    return stream_page('pages/venues.html', areas=areas, page=Page([]), filters=filters, facets=counts)
+
+  # Page over city/state areas rather than venues so an area is never split.
+  # Pages are addressed by the (state, city) key of the neighbouring area.
+  per_page = app.config['AREAS_PER_PAGE']
+  areas, backwards, from_cursor = keyset_query(
+    facets.apply(db.session.query(Venue.state, Venue.city).distinct(), Venue, filters),
+    (Venue.state, Venue.city), per_page,
+    after=request.args.get('after'), before=request.args.get('before'))
+  areas = areas.subquery()
+
+  # Number the page's areas (plus the look-ahead one) and pull their venues in
+  # the same statement, backed by ix_venue_state_city_name
+  area_order = (areas.c.state.desc(), areas.c.city.desc()) if backwards else (areas.c.state, areas.c.city)
+  numbered = db.session.query(
+    areas.c.state,
+    areas.c.city,
+    func.row_number().over(order_by=area_order).label('area_number'),
+    func.count().over().label('area_count')
+  ).subquery()
+  rows = db.session.query(
+    Venue.id, Venue.name, Venue.city, Venue.state, numbered.c.area_count
+  ).join(numbered, (Venue.state == numbered.c.state) & (Venue.city == numbered.c.city)) \
+   .filter(numbered.c.area_number <= per_page) \
+   .order_by(Venue.state, Venue.city, Venue.name, Venue.id)
+  rows = read_all(facets.apply(rows, Venue, filters))
+
+  data = [{
+    "city": city,
+    "state": state,
+    "venues": [{
+      "id": venue.id,
+      "name": venue.name,
+    } for venue in area_venues]
+  } for (state, city), area_venues in groupby(rows, key=lambda row: (row.state, row.city))]
+
+  page = Page(data)
+  if data:
+    more = rows[0].area_count > per_page
+    has_next = more if not backwards else True
+    has_prev = more if backwards else from_cursor
+    page = Page(data,
+                next_key=(data[-1]["state"], data[-1]["city"]) if has_next else None,
+                prev_key=(data[0]["state"], data[0]["city"]) if has_prev else None)
+  return render_template('pages/venues.html', areas=data, page=page, filters=filters, facets=counts)
+
+def facet_counts(model, filters):
+  # At most FACET_VALUES_SHOWN values per facet, most common first
+  shown = app.config['FACET_VALUES_SHOWN']
+  return {facet: values[:shown] for facet, values in facets.facet_counts(model, filters, fetch=read_all).items()}
+
+def suggestions(suggest):
+  # JSON for the typeahead lookups: at most TYPEAHEAD_LIMIT hits, cacheable
+  # by the browser for a short while
+  limit = min(request.args.get('limit', app.config['TYPEAHEAD_LIMIT'], type=int), app.config['TYPEAHEAD_LIMIT'])
+  rows = suggest(request.args.get('q', ''), limit=max(limit, 1), fetch=read_all)
+  response = jsonify(data=[{"id": row.id, "name": row.name} for row in rows])
+  response.cache_control.public = True
+  response.cache_control.max_age = app.config['TYPEAHEAD_MAX_AGE']
+  return response
+
+@app.route('/search')
+@replicas.reads
+def site_search():
+  # Venues, artists and upcoming shows matching ?q=, best first, paged by
+  # ?page= (see fulltext.py)
+  search_term = request.args.get('q', '')
+  per_page = app.config['SEARCH_PAGE_SIZE']
+  page_number = max(request.args.get('page', 1, type=int), 1)
+  rows = fulltext.search_all(search_term, per_page, (page_number - 1) * per_page, fetch=read_all)
+  return render_template('pages/search.html', search_term=search_term, results=rows[:per_page],
+                         page_number=page_number, has_next=len(rows) > per_page)
 
 @app.route('/venues/search', methods=['POST'])
+@replicas.reads
 def search_venues():
   search_term=request.form.get('search_term', '')
-  artists = Venue.query.filter(Venue.name.ilike(f'%{search_term}%')).all()  
+  venues = search.find_venues(search_term, limit=app.config['SEARCH_RESULTS_LIMIT'], fetch=read_all)
   response={
-    "count": len(artists),
+    "count": venues[0].total if venues else 0,
     "data": [{
-      "id": artist.id,
-      "name": artist.name,
-      "num_upcoming_shows": len([show for show in artist.shows if show.start_time >= datetime.now()]),
-    } for artist in artists]
+      "id": venue.id,
+      "name": venue.name,
+      "num_upcoming_shows": venue.num_upcoming_shows,
+    } for venue in venues]
   }
   return render_template('pages/search_venues.html', results=response, search_term=search_term)
 
+@app.route('/api/venues/suggest')
+@replicas.reads
+def suggest_venues():
+  # Venues whose name starts with ?q=, for the show form's autocomplete
+  return suggestions(search.suggest_venues)
+
 @app.route('/venues/<int:venue_id>')
+@replicas.reads
+@conditional_get.conditional(lambda venue_id: [f'venue:{venue_id}', 'artists'])
+@page_cache.cached()
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
-  venue = db.session.query(Venue).outerjoin(Show, Show.venue_id == Venue.id).filter(Venue.id == venue_id).first()
-  past_shows = db.session.query(Show).join(Venue, Show.venue_id == Venue.id).filter(Show.start_time < datetime.now(), Venue.id == venue_id).all()
-  upcoming_shows = db.session.query(Show).join(Venue, Show.venue_id == Venue.id).filter(Show.start_time >= datetime.now(), Venue.id == venue_id).all()
-  venue_genres = db.session.query(VenueGenre.genre).filter(VenueGenre.venue_id == venue_id).all()
+  # One statement for the venue and its genres, one for its shows and their
+  # artists, with the past/upcoming split computed by the database
+  shows = db.session.query(
+    Show.artist_id,
+    Artist.name.label('artist_name'),
+    Artist.image_link.label('artist_image_link'),
+    Show.start_time,
+    (Show.start_time >= datetime.now()).label('is_upcoming')
+  ).join(Artist, Show.artist_id == Artist.id).filter(Show.venue_id == venue_id).order_by(Show.start_time)
+  if async_reads.enabled:
+    # The venue, its genres and its shows are independent: fetched concurrently
+    venue, genres, shows = async_reads.fetch(
+      select(*Venue.__table__.c).where(Venue.id == venue_id),
+      select(Genre.name).join(VenueGenre, VenueGenre.genre_id == Genre.id)
+        .where(VenueGenre.venue_id == venue_id).order_by(Genre.id),
+      shows.statement)
+    venue = venue[0] if venue else None
+    genres = [genre.name for genre in genres]
+    if venue is None:
+      abort(404)
+  else:
+    venue = db.session.get(Venue, venue_id, options=[joinedload(Venue.genres).joinedload(VenueGenre.genre)])
+    if venue is None:
+      abort(404)
+    genres = [genre.genre.name for genre in venue.genres]
+    shows = shows.all()
+  past_shows = [show for show in shows if not show.is_upcoming]
+  upcoming_shows = [show for show in shows if show.is_upcoming]
+  page_cache.tag(f'venue:{venue_id}', *{f'artist:{show.artist_id}' for show in shows})
 
   realData = {
     "id": venue.id,
     "name": venue.name,
-    "genres": [genre[0] for genre in venue_genres],
+    "genres": genres,
     "city": venue.city,
     "state": venue.state,
     "phone": venue.phone,
@@ -123,15 +318,15 @@ def show_venue(venue_id):
     "image_link": venue.image_link,
     "past_shows": [{
       "artist_id": show.artist_id,
-      "artist_name": show.artistForShows.name,
-      "artist_image_link": show.artistForShows.image_link,
-      "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S")
+      "artist_name": show.artist_name,
+      "artist_image_link": show.artist_image_link,
+      "start_time": show.start_time
     } for show in past_shows],
     "upcoming_shows": [{
       "artist_id": show.artist_id,
-      "artist_name": show.artistForShows.name,
-      "artist_image_link": show.artistForShows.image_link,
-      "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S")
+      "artist_name": show.artist_name,
+      "artist_image_link": show.artist_image_link,
+      "start_time": show.start_time
     } for show in upcoming_shows],
     "past_shows_count": len(past_shows),
     "upcoming_shows_count": len(upcoming_shows)
@@ -143,11 +338,13 @@ def show_venue(venue_id):
 #  ----------------------------------------------------------------
 
 @app.route('/venues/create', methods=['GET'])
+@uses_genres
 def create_venue_form():
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
 @app.route('/venues/create', methods=['POST'])
+@uses_genres
 def create_venue_submission():
   form = VenueForm(request.form, meta={'csrf': False})
   if form.validate():
@@ -162,17 +359,15 @@ def create_venue_submission():
         image_link=form.image_link.data,
         website_link=form.website_link.data,
         seeking_talent=bool(form.seeking_talent.data),
-        seeking_description=form.seeking_description.data) 
+        seeking_description=form.seeking_description.data,
+        genres=[VenueGenre(genre_id=genre_ids[genre_name]) for genre_name in form.genres.data])
+      # one flush: the venue id comes back from INSERT ... RETURNING and is
+      # used for its genre rows in the same transaction
       db.session.add(newVenue)
+      versions.bump(db.session, 'venues')
       db.session.commit()
-          
-      genres = form.genres.data
-      print(genres)
-      for genre_name in genres:
-        genre = VenueGenre(genre=genre_name, venue_id=newVenue.id)
-        db.session.add(genre)
-      
-      db.session.commit()
+      page_cache.invalidate('venues')
+      home_feed.listed(Venue, newVenue)
       # on successful db insert, flash success
       flash('Venue ' + request.form['name'] + ' was successfully listed!')
     except Exception as e:
@@ -189,16 +384,29 @@ def create_venue_submission():
         form = VenueForm()
         return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/delete/<venue_id>', methods=['GET'])
+@app.route('/venues/delete/<int:venue_id>', methods=['GET'])
 def delete_venue(venue_id):
-  venue = Venue.query.get(venue_id)
+  return delete_entity(Venue, venue_id)
+
+def delete_entity(model, entity_id):
+  # Shows and genres go with the entity through ON DELETE CASCADE; one with
+  # many shows loses them in batches first (see purge.py)
+  label = model.__name__
+
+  def committed(keys):
+    # Each batch of shows is committed on its own; drop its pages at once
+    page_cache.invalidate(*keys)
+    home_feed.changed()
+
   try:
-    db.session.delete(venue)
-    db.session.commit()
-    flash('Venue was successfully deleted!')
+    keys = purge.purge(db.session, model, entity_id, app.config['PURGE_BATCH_SIZE'], committed=committed)
+    if keys is None:
+      flash(f'{label} {entity_id} was not found.')
+    else:
+      flash(f'{label} was successfully deleted!')
   except Exception as e:
     print(e)
-    flash('An error occurred. Venue could not be deleted.')
+    flash(f'An error occurred. {label} could not be deleted.')
     db.session.rollback()
   finally:
     db.session.close()
@@ -207,34 +415,82 @@ def delete_venue(venue_id):
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@replicas.reads
+@conditional_get.conditional(lambda: ['artists'])
+@page_cache.cached('artists')
 def artists():
-  return render_template('pages/artists.html', artists=Artist.query.with_entities(Artist.id, Artist.name).all())
+  filters = facets.from_args(request.args)
+  counts = facet_counts(Artist, filters)
+  query = facets.apply(Artist.query.with_entities(Artist.id, Artist.name), Artist, filters)
+  if app.config['STREAM_LISTINGS']:
+    rows = stream_rows(query.order_by(Artist.name, Artist.id), app.config['STREAM_BATCH_SIZE'])
+    return stream_page('pages/artists.html', artists=rows, page=Page([]), filters=filters, facets=counts)
+
+  page = paginate(query, (Artist.name, Artist.id), app.config['PAGE_SIZE'],
+                  after=request.args.get('after'), before=request.args.get('before'), fetch=read_all)
+  return render_template('pages/artists.html', artists=page.items, page=page, filters=filters, facets=counts)
 
 @app.route('/artists/search', methods=['POST'])
+@replicas.reads
 def search_artists():
   search_term=request.form.get('search_term', '')
-  artists = Artist.query.filter(Artist.name.ilike(f'%{search_term}%')).all()  
+  artists = search.find_artists(search_term, limit=app.config['SEARCH_RESULTS_LIMIT'], fetch=read_all)
   response={
-    "count": len(artists),
+    "count": artists[0].total if artists else 0,
     "data": [{
       "id": artist.id,
       "name": artist.name,
-      "num_upcoming_shows": len([show for show in artist.shows if show.start_time >= datetime.now()]),
+      "num_upcoming_shows": artist.num_upcoming_shows,
     } for artist in artists]
   }
   return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
+@app.route('/api/artists/suggest')
+@replicas.reads
+def suggest_artists():
+  # Artists whose name starts with ?q=, for the show form's autocomplete
+  return suggestions(search.suggest_artists)
+
 @app.route('/artists/<int:artist_id>')
+@replicas.reads
+@conditional_get.conditional(lambda artist_id: [f'artist:{artist_id}', 'venues'])
+@page_cache.cached()
 def show_artist(artist_id):
   # shows the artist page with the given artist_id
-  artist = db.session.query(Artist).outerjoin(Show, Show.artist_id == Artist.id).filter(Artist.id == artist_id).first()
-  past_shows = db.session.query(Show).join(Artist, Show.artist_id == Artist.id).filter(Show.start_time < datetime.now(), Artist.id == artist_id).all()
-  upcoming_shows = db.session.query(Show).join(Artist, Show.artist_id == Artist.id).filter(Show.start_time >= datetime.now(), Artist.id == artist_id).all()
-  artist_genres = db.session.query(ArtistGenre.genre).filter(ArtistGenre.artist_id == artist_id).all()
+  # One statement for the artist and its genres, one for its shows and their
+  # venues, with the past/upcoming split computed by the database
+  shows = db.session.query(
+    Show.venue_id,
+    Venue.name.label('venue_name'),
+    Venue.image_link.label('venue_image_link'),
+    Show.start_time,
+    (Show.start_time >= datetime.now()).label('is_upcoming')
+  ).join(Venue, Show.venue_id == Venue.id).filter(Show.artist_id == artist_id).order_by(Show.start_time)
+  if async_reads.enabled:
+    # The artist, its genres and its shows are independent: fetched concurrently
+    artist, genres, shows = async_reads.fetch(
+      select(*Artist.__table__.c).where(Artist.id == artist_id),
+      select(Genre.name).join(ArtistGenre, ArtistGenre.genre_id == Genre.id)
+        .where(ArtistGenre.artist_id == artist_id).order_by(Genre.id),
+      shows.statement)
+    artist = artist[0] if artist else None
+    genres = [genre.name for genre in genres]
+    if artist is None:
+      abort(404)
+  else:
+    artist = db.session.get(Artist, artist_id, options=[joinedload(Artist.genres).joinedload(ArtistGenre.genre)])
+    if artist is None:
+      abort(404)
+    genres = [genre.genre.name for genre in artist.genres]
+    shows = shows.all()
+  past_shows = [show for show in shows if not show.is_upcoming]
+  upcoming_shows = [show for show in shows if show.is_upcoming]
+  page_cache.tag(f'artist:{artist_id}', *{f'venue:{show.venue_id}' for show in shows})
+
   realData = {
     "id": artist.id,
     "name": artist.name,
-    "genres": [genre[0] for genre in artist_genres],
+    "genres": genres,
     "city": artist.city,
     "state": artist.state,
     "phone": artist.phone,
@@ -244,16 +500,16 @@ def show_artist(artist_id):
     "seeking_description": artist.seeking_description,
     "image_link": artist.image_link,
     "past_shows": [{
-      "artist_id": show.artist_id,
-      "artist_name": show.artistForShows.name,
-      "artist_image_link": show.venueForShows.image_link,
-    "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S")
+      "venue_id": show.venue_id,
+      "venue_name": show.venue_name,
+      "venue_image_link": show.venue_image_link,
+      "start_time": show.start_time
     } for show in past_shows],
     "upcoming_shows": [{
-      "artist_id": show.artist_id,
-      "artist_name": show.artistForShows.name,
-      "artist_image_link": show.venueForShows.image_link,
-    "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S")
+      "venue_id": show.venue_id,
+      "venue_name": show.venue_name,
+      "venue_image_link": show.venue_image_link,
+      "start_time": show.start_time
     } for show in upcoming_shows],
     "past_shows_count": len(past_shows),
     "upcoming_shows_count": len(upcoming_shows)
@@ -261,20 +517,63 @@ def show_artist(artist_id):
 
   return render_template('pages/show_artist.html', artist=realData)
 
+#  Genres
+#  ----------------------------------------------------------------
+
+@app.route('/genres/<genre>/venues')
+@replicas.reads
+@conditional_get.conditional(lambda genre: ['venues'])
+@page_cache.cached('venues')
+@uses_genres
+def venues_by_genre(genre):
+  if genre not in genre_ids:
+    abort(404)
+  # Filtered through ix_venue_genre_genre_id_venue_id
+  page = paginate(
+    db.session.query(Venue.id, Venue.name)
+      .join(VenueGenre, VenueGenre.venue_id == Venue.id)
+      .filter(VenueGenre.genre_id == genre_ids[genre]),
+    (Venue.name, Venue.id), app.config['PAGE_SIZE'],
+    after=request.args.get('after'), before=request.args.get('before'), fetch=read_all)
+  return render_template('pages/genre.html', genre=genre, kind='venues', items=page.items, page=page)
+
+@app.route('/genres/<genre>/artists')
+@replicas.reads
+@conditional_get.conditional(lambda genre: ['artists'])
+@page_cache.cached('artists')
+@uses_genres
+def artists_by_genre(genre):
+  if genre not in genre_ids:
+    abort(404)
+  # Filtered through ix_artist_genre_genre_id_artist_id
+  page = paginate(
+    db.session.query(Artist.id, Artist.name)
+      .join(ArtistGenre, ArtistGenre.artist_id == Artist.id)
+      .filter(ArtistGenre.genre_id == genre_ids[genre]),
+    (Artist.name, Artist.id), app.config['PAGE_SIZE'],
+    after=request.args.get('after'), before=request.args.get('before'), fetch=read_all)
+  return render_template('pages/genre.html', genre=genre, kind='artists', items=page.items, page=page)
+
 #  Update
 #  ----------------------------------------------------------------
+@app.route('/artists/delete/<int:artist_id>', methods=['GET'])
+def delete_artist(artist_id):
+  return delete_entity(Artist, artist_id)
+
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@uses_genres
 def edit_artist(artist_id):
   form = ArtistForm()
   return render_template('forms/edit_artist.html', form=form, artist=Artist.query.get(artist_id))
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@uses_genres
 def edit_artist_submission(artist_id):
   # take values from the form submitted, and update existing artist record with ID <artist_id> using the new attributes
   form = ArtistForm(request.form, meta={'csrf': False})
   if form.validate():
     try:
-      updateArtist = Artist.query.get(artist_id)
+      updateArtist = db.session.get(Artist, artist_id, options=[joinedload(Artist.genres)])
       updateArtist.name = form.name.data
       updateArtist.city = form.city.data
       updateArtist.state = form.state.data
@@ -284,19 +583,11 @@ def edit_artist_submission(artist_id):
       updateArtist.website_link = form.website_link.data
       updateArtist.seeking_venue = bool(form.seeking_venue.data)
       updateArtist.seeking_description = form.seeking_description.data
+      sync_genres(updateArtist.genres, ArtistGenre, form.genres.data)
+      versions.bump(db.session, f'artist:{artist_id}', 'artists')
       db.session.commit()
-      
-      genres = form.genres.data
-      updateGenres = ArtistGenre.query.filter(ArtistGenre.artist_id == artist_id).all()
-      
-      for genre in updateGenres:
-        db.session.delete(genre)
-        
-      for genre in genres:
-        newGenre = ArtistGenre(genre=genre, artist_id=artist_id)
-        db.session.add(newGenre)
-        
-      db.session.commit()
+      page_cache.invalidate(f'artist:{artist_id}', 'artists', 'shows')
+      home_feed.changed()
       flash('Artist ' + request.form['name'] + ' was successfully updated!')
     except Exception as e:
       print(e)
@@ -314,17 +605,19 @@ def edit_artist_submission(artist_id):
         return render_template('forms/edit_artist.html', form=form, artist=Artist.query.get(artist_id))
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@uses_genres
 def edit_venue(venue_id):
   form = VenueForm()
   return render_template('forms/edit_venue.html', form=form, venue=Venue.query.get(venue_id))
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@uses_genres
 def edit_venue_submission(venue_id):
   # take values from the form submitted, and update existing venue record with ID <venue_id> using the new attributes 
   form = VenueForm(request.form, meta={'csrf': False})
   if form.validate():
     try:
-      updateVenue = Venue.query.get(venue_id)
+      updateVenue = db.session.get(Venue, venue_id, options=[joinedload(Venue.genres)])
       updateVenue.name = form.name.data
       updateVenue.city = form.city.data
       updateVenue.state = form.state.data
@@ -334,18 +627,11 @@ def edit_venue_submission(venue_id):
       updateVenue.website_link = form.website_link.data
       updateVenue.seeking_talent = bool(form.seeking_talent.data)
       updateVenue.seeking_description = form.seeking_description.data
+      sync_genres(updateVenue.genres, VenueGenre, form.genres.data)
+      versions.bump(db.session, f'venue:{venue_id}', 'venues')
       db.session.commit()
-      
-      genres = form.genres.data
-      updateGenres = VenueGenre.query.filter(VenueGenre.venue_id == venue_id).all()
-      
-      for genre in updateGenres:
-        db.session.delete(genre)
-        
-      for genre in genres:
-        newGenre = VenueGenre(genre=genre, venue_id=venue_id)
-        db.session.add(newGenre)
-      db.session.commit()
+      page_cache.invalidate(f'venue:{venue_id}', 'venues', 'shows')
+      home_feed.changed()
       flash('Venue ' + request.form['name'] + ' was successfully updated!')
     except Exception as e:
       print(e)
@@ -366,11 +652,13 @@ def edit_venue_submission(venue_id):
 #  ----------------------------------------------------------------
 
 @app.route('/artists/create', methods=['GET'])
+@uses_genres
 def create_artist_form():
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
 @app.route('/artists/create', methods=['POST'])
+@uses_genres
 def create_artist_submission():
   # called upon submitting the new artist listing form
   form = ArtistForm(request.form, meta={'csrf': False})
@@ -385,17 +673,15 @@ def create_artist_submission():
         image_link=form.image_link.data,
         website_link=form.website_link.data,
         seeking_venue=bool(form.seeking_venue.data),
-        seeking_description=form.seeking_description.data) 
+        seeking_description=form.seeking_description.data,
+        genres=[ArtistGenre(genre_id=genre_ids[genre_name]) for genre_name in form.genres.data])
+      # one flush: the artist id comes back from INSERT ... RETURNING and is
+      # used for its genre rows in the same transaction
       db.session.add(newArtist)
+      versions.bump(db.session, 'artists')
       db.session.commit()
-          
-      genres = form.genres.data
-      
-      for genre_name in genres:
-        genre = ArtistGenre(genre=genre_name, artist_id=newArtist.id)
-        db.session.add(genre)
-      
-      db.session.commit()
+      page_cache.invalidate('artists')
+      home_feed.listed(Artist, newArtist)
       flash('Artist ' + request.form['name'] + ' was successfully listed!')
     except Exception as e:
       print(e)
@@ -416,6 +702,9 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@replicas.reads
+@conditional_get.conditional(lambda: ['shows', 'venues', 'artists'])
+@page_cache.cached('shows')
 def shows():
   # displays list of shows at /shows
   realData = db.session.query(
@@ -424,26 +713,49 @@ def shows():
     Show.artist_id,
     Artist.name.label('artist_name'),
     Artist.image_link.label('artist_image_link'),
-    func.to_char(Show.start_time, 'YYYY-MM-DD"T"HH12:MI:SS').label('start_time')
-  ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id).all()
-  return render_template('pages/shows.html', shows=realData)
+    Show.start_time
+  ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)
+  if app.config['STREAM_LISTINGS']:
+    rows = stream_rows(realData.order_by(Show.start_time, Show.id), app.config['STREAM_BATCH_SIZE'])
+    return stream_page('pages/shows.html', shows=rows, page=Page([]))
+
+  page = paginate(realData, (Show.start_time, Show.id), app.config['PAGE_SIZE'],
+                  after=request.args.get('after'), before=request.args.get('before'), fetch=read_all)
+  return render_template('pages/shows.html', shows=page.items, page=page)
+
+REPEAT_FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
 
 @app.route('/shows/create')
 def create_shows():
-  artists = Artist.query.with_entities(Artist.id, Artist.name).all()
-  venues = Venue.query.with_entities(Venue.id, Venue.name).all()
-  return render_template('forms/new_show.html', artists=artists, venues=venues)
+  # Artists and venues are picked through the /api/*/suggest lookups
+  return render_template('forms/new_show.html')
 
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
-  # called to create new shows in the db, upon submitting new show listing form
+  # called to create new shows in the db, upon submitting new show listing form;
+  # with a repeat frequency every date of the residency is listed at once
+  venue_id, artist_id = request.form.get('venue_id'), request.form.get('artist_id')
   try:
-    newShow = Show(start_time=request.form.get('start_time'),
-                    artist_id=request.form.get('artist_id'),
-                    venue_id=request.form.get('venue_id')) 
-    db.session.add(newShow)
+    start_time = datetime.fromisoformat(request.form.get('start_time'))
+    duration = timedelta(minutes=int(request.form.get('duration') or scheduling.DEFAULT_DURATION.total_seconds() // 60))
+    rule = None
+    if request.form.get('repeat'):
+      if request.form['repeat'] not in REPEAT_FREQUENCIES:
+        raise scheduling.SchedulingError('unknown repeat frequency')
+      rule = f"FREQ={request.form['repeat']};COUNT={int(request.form.get('occurrences') or 1)}"
+    rows = scheduling.schedule(db.session, [{
+      "venue_id": venue_id,
+      "artist_id": artist_id,
+      "start_time": start,
+      "end_time": start + duration,
+    } for start in scheduling.occurrences(start_time, rule)])
     db.session.commit()
-    flash('Show was successfully listed!')
+    page_cache.invalidate('shows', f'venue:{venue_id}', f'artist:{artist_id}')
+    home_feed.scheduled(rows)
+    flash(f'{len(rows)} shows were successfully listed!' if len(rows) > 1 else 'Show was successfully listed!')
+  except scheduling.SchedulingError as e:
+    flash(f'Show could not be listed: {e}.')
+    db.session.rollback()
   except Exception as e:
     print(e)
     flash('An error occurred. Show could not be listed.')
@@ -452,6 +764,62 @@ def create_show_submission():
     db.session.close()
   return render_template('pages/home.html')
 
+@app.route('/api/shows', methods=['POST'])
+def schedule_shows():
+  # Schedules a batch, {"shows": [{"venue_id", "artist_id", "start_time",
+  # "end_time"?}, ...]}, or a recurrence, {"venue_id", "artist_id",
+  # "start_time", "duration_minutes"?, "rrule"?}. All shows are created or,
+  # on any double booking, none.
+  body = request.get_json(silent=True)
+  if not isinstance(body, dict):
+    return jsonify(error='expected a JSON object'), 400
+  try:
+    if 'shows' in body:
+      shows = [{
+        "venue_id": show['venue_id'],
+        "artist_id": show['artist_id'],
+        "start_time": datetime.fromisoformat(show['start_time']),
+        "end_time": datetime.fromisoformat(show['end_time']) if show.get('end_time') else None,
+      } for show in body['shows']]
+    else:
+      duration = timedelta(minutes=body['duration_minutes']) if body.get('duration_minutes') else scheduling.DEFAULT_DURATION
+      shows = [{
+        "venue_id": body['venue_id'],
+        "artist_id": body['artist_id'],
+        "start_time": start,
+        "end_time": start + duration,
+      } for start in scheduling.occurrences(datetime.fromisoformat(body['start_time']), body.get('rrule'))]
+    rows = scheduling.schedule(db.session, shows)
+    db.session.commit()
+  except scheduling.ShowConflict as e:
+    db.session.rollback()
+    return jsonify(error=str(e), conflict=e.owner), 409
+  except (scheduling.SchedulingError, KeyError, TypeError, ValueError) as e:
+    db.session.rollback()
+    return jsonify(error=str(e) if isinstance(e, scheduling.SchedulingError) else f'invalid request: {e!r}'), 400
+  page_cache.invalidate('shows', *{f"venue:{row['venue_id']}" for row in rows},
+                        *{f"artist:{row['artist_id']}" for row in rows})
+  home_feed.scheduled(rows)
+  return jsonify(created=len(rows), shows=[{
+    "venue_id": row['venue_id'],
+    "artist_id": row['artist_id'],
+    "start_time": row['start_time'].isoformat(),
+    "end_time": row['end_time'].isoformat(),
+  } for row in rows]), 201
+
+#  Admin
+#  ----------------------------------------------------------------
+
+@app.route('/admin/sql-stats')
+def sql_stats():
+  # per-endpoint query counts and DB time, only when profiling is on and the
+  # caller presents the admin token
+  token = app.config['SQL_PROFILER_ADMIN_TOKEN']
+  supplied = request.headers.get('X-Admin-Token', '')
+  if not profiler.enabled or not token or not hmac.compare_digest(supplied, token):
+    abort(404)
+  return jsonify([{"endpoint": endpoint, **stats} for endpoint, stats in profiler.stats().items()])
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -471,6 +839,65 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+@app.cli.command('import-data')
+@click.option('--venues', type=click.Path(exists=True, dir_okay=False), help='CSV/JSONL file of venues.')
+@click.option('--artists', type=click.Path(exists=True, dir_okay=False), help='CSV/JSONL file of artists.')
+@click.option('--shows', type=click.Path(exists=True, dir_okay=False), help='CSV/JSONL file of shows.')
+@click.option('--chunk-size', default=10000, show_default=True, help='Rows per transaction.')
+def import_data(venues, artists, shows, chunk_size):
+  """Bulk load venues, artists (with genres) and shows."""
+  try:
+    if venues:
+      importer.import_venues(venues, chunk_size, click.echo)
+    if artists:
+      importer.import_artists(artists, chunk_size, click.echo)
+    if shows:
+      importer.import_shows(shows, chunk_size, click.echo)
+  except importer.DataImportError as e:
+    raise click.ClickException(str(e))
+
+@app.cli.command('refresh-show-counts')
+@click.option('--lookback-minutes', default=int(counters.DEFAULT_LOOKBACK.total_seconds() // 60), show_default=True,
+              help='Recount owners of shows that started this recently. Run more often than this.')
+@click.option('--full', is_flag=True, help='Recount every venue and artist.')
+def refresh_show_counts(lookback_minutes, full):
+  """Roll started shows from upcoming to past in the venue/artist counters."""
+  with db.engine.begin() as conn:
+    if full:
+      updated = counters.refresh_all(conn)
+      # every detail page may have shows that moved from upcoming to past
+      versions.bump(conn, 'venues', 'artists')
+    else:
+      recounted = counters.roll_over(conn, timedelta(minutes=lookback_minutes))
+      versions.bump(conn, *[f'{table}:{owner_id}' for table, ids in recounted.items() for owner_id in ids])
+      updated = {table: len(ids) for table, ids in recounted.items()}
+  for table, rows in updated.items():
+    click.echo(f'{table}: {rows} rows recounted')
+
+@app.cli.command('purge')
+@click.option('--venue', 'venue_id', type=int, help='Id of the venue to delete.')
+@click.option('--artist', 'artist_id', type=int, help='Id of the artist to delete.')
+@click.option('--batch-size', default=None, type=int, help='Shows per transaction [default: PURGE_BATCH_SIZE].')
+def purge_entity(venue_id, artist_id, batch_size):
+  """Delete a venue or artist with its shows, a batch of shows at a time."""
+  if (venue_id is None) == (artist_id is None):
+    raise click.UsageError('Give exactly one of --venue and --artist.')
+  model, entity_id = (Venue, venue_id) if venue_id is not None else (Artist, artist_id)
+  keys = purge.purge(db.session, model, entity_id, batch_size or app.config['PURGE_BATCH_SIZE'], click.echo)
+  if keys is None:
+    raise click.ClickException(f'{model.__tablename__} {entity_id} not found')
+  click.echo(f'{model.__tablename__} {entity_id} deleted')
+
+@app.cli.command('build-assets')
+def build_assets():
+  """Bundle, minify, fingerprint and gzip static assets into static/dist."""
+  AssetBuilder(app.static_folder).build(click.echo)
+  click.echo('Restart the app to serve the new bundles.')
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
@@ -0,0 +1,13 @@
+import os
+
+from a2wsgi import WSGIMiddleware
+from app import app
+
+# ASGI entry point, e.g. `uvicorn asgi:application --workers 4`.
+#
+# Requests run on a pool of threads per process, and with ASYNC_READS their
+# reads are multiplexed on the process's async engine (see aio.py).
+# asgiref's WsgiToAsgi is not used here as it runs every request on the same
+# thread.
+
+application = WSGIMiddleware(app, workers=int(os.environ.get('ASGI_THREADS', 10)))
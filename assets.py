@@ -0,0 +1,177 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+# Fingerprinted, precompressed static assets.
+#
+# `flask build-assets` concatenates each bundle below, minifies it, writes it
+# to static/dist under a content-hashed name together with a gzip variant, and
+# records the names in static/dist/manifest.json. Files referenced from bundled
+# CSS (fonts, images) are fingerprinted and rewritten the same way. Templates
+# link bundles through asset_urls(), which falls back to the individual source
+# files when no build exists, e.g. in development. Built files are served from
+# /assets with far-future immutable caching.
+
+BUNDLES = {
+    'app.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    # Loaded blocking in <head>
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # Deferred, after jQuery
+    'app.js': [
+        'js/script.js',
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+    ],
+    'jquery.js': ['js/libs/jquery-1.11.1.min.js'],
+    'front-splash.jpg': ['img/front-splash.jpg'],
+}
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.eot', '.ttf', '.otf', '.json')
+MAX_AGE = 365 * 24 * 60 * 60
+
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+?)\1\s*\)''')
+
+
+def _fingerprint(name, content):
+    stem, extension = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+
+def minify_css(css):
+    # /*! comments are license banners, such as Bootstrap's: they are kept
+    # verbatim, each on its own line, and every other comment is dropped
+    banners = []
+
+    def comment(match):
+        if not match.group(0).startswith('/*!'):
+            return ''
+        banners.append(match.group(0))
+        return f'/*!{len(banners) - 1}*/'
+
+    css = re.sub(r'/\*.*?\*/', comment, css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r'\s*/\*!(\d+)\*/\s*', lambda match: f'\n{banners[int(match.group(1))]}\n', css)
+    return css.replace(';}', '}').strip()
+
+def minify_js(js):
+    # Without a JavaScript parser only whitespace at the edges is safe to drop;
+    # the vendored libraries ship minified already
+    return js.strip()
+
+
+class AssetBuilder:
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.output = os.path.join(static_folder, 'dist')
+        self.manifest = {}
+
+    def build(self, echo=print):
+        if os.path.isdir(self.output):
+            shutil.rmtree(self.output)
+        os.makedirs(self.output)
+        for bundle, sources in BUNDLES.items():
+            if bundle.endswith('.css'):
+                content = minify_css('\n'.join(self._css(source) for source in sources)).encode()
+            elif bundle.endswith('.js'):
+                content = ';\n'.join(minify_js(self._read(source).decode()) for source in sources).encode()
+            else:
+                content = b''.join(self._read(source) for source in sources)
+            self.manifest[bundle] = self._write(bundle, content)
+            original = sum(os.path.getsize(os.path.join(self.static_folder, source)) for source in sources)
+            echo(f'{bundle}: {len(sources)} file(s), {original:,} -> {len(content):,} bytes -> {self.manifest[bundle]}')
+        with open(os.path.join(self.output, 'manifest.json'), 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        return self.manifest
+
+    def _read(self, source):
+        with open(os.path.join(self.static_folder, source), 'rb') as f:
+            return f.read()
+
+    def _write(self, name, content):
+        filename = _fingerprint(os.path.basename(name), content)
+        path = os.path.join(self.output, filename)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if filename.endswith(COMPRESSIBLE):
+            with gzip.open(path + '.gz', 'wb', compresslevel=9) as f:
+                f.write(content)
+        return filename
+
+    def _css(self, source):
+        # Bundles are served from another directory, so relative url()s are
+        # pointed at fingerprinted copies next to the bundle
+        directory = os.path.dirname(source)
+
+        def rewrite(match):
+            url = match.group(2)
+            if re.match(r'^([a-z]+:|/|#)', url):
+                return match.group(0)
+            path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+            referenced = os.path.normpath(os.path.join(directory, path))
+            if not os.path.isfile(os.path.join(self.static_folder, referenced)):
+                return f'url("/static/{referenced}{suffix}")'
+            if referenced not in self.manifest:
+                self.manifest[referenced] = self._write(referenced, self._read(referenced))
+            return f'url("{self.manifest[referenced]}{suffix}")'
+
+        return CSS_URL.sub(rewrite, self._read(source).decode())
+
+
+class Assets:
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.output = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.output = os.path.join(app.static_folder, 'dist')
+        try:
+            with open(os.path.join(self.output, 'manifest.json')) as f:
+                self.manifest = json.load(f)
+        except FileNotFoundError:
+            self.manifest = {}
+        app.add_url_rule('/assets/<path:filename>', 'asset', self.send_asset)
+        app.jinja_env.globals.update(asset_urls=self.asset_urls, asset_url=self.asset_url)
+        app.extensions['assets'] = self
+
+    def asset_urls(self, bundle):
+        if bundle in self.manifest:
+            return [url_for('asset', filename=self.manifest[bundle])]
+        return [url_for('static', filename=source) for source in BUNDLES[bundle]]
+
+    def asset_url(self, name):
+        # For single-file entries such as images
+        url, = self.asset_urls(name)
+        return url
+
+    def send_asset(self, filename):
+        # Names are content hashes, so a response never goes stale
+        compressed = (filename.endswith(COMPRESSIBLE) and 'gzip' in request.accept_encodings
+                      and os.path.isfile(os.path.join(self.output, filename + '.gz')))
+        if compressed:
+            response = send_from_directory(self.output, filename + '.gz', max_age=MAX_AGE,
+                                           mimetype=mimetypes.guess_type(filename)[0])
+            response.content_encoding = 'gzip'
+        else:
+            response = send_from_directory(self.output, filename, max_age=MAX_AGE)
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
@@ -0,0 +1,52 @@
+"""Read routes in the sync mode against ASYNC_READS=1 (see aio.py).
+
+Runs benchmarks.routes over the listing, search and detail routes once per
+mode, each in its own process with the page cache off, at every
+--concurrency level given, and prints the two side by side. The detail
+pages are where the async mode differs most: their three statements run
+concurrently instead of one after another, which pays off with the network
+round trips of a remote Postgres more than with a local SQLite file.
+
+    python -m benchmarks.async_reads [--requests 200] [--concurrency 1 8]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+READ_ROUTES = ['venues', 'artists', 'shows', 'search_venues', 'search_artists', 'show_venue', 'show_artist']
+
+
+def run_mode(async_reads, requests, concurrency):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results.json')
+        command = [sys.executable, '-m', 'benchmarks.routes', '--requests', str(requests),
+                   '--concurrency', str(concurrency), '--no-page-cache', '--save', path]
+        for route in READ_ROUTES:
+            command += ['--route', route]
+        env = dict(os.environ, ASYNC_READS='1' if async_reads else '0')
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+        with open(path) as f:
+            return json.load(f)['routes']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route and mode.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        sync = run_mode(False, args.requests, concurrency)
+        async_ = run_mode(True, args.requests, concurrency)
+        print(f'\nconcurrency {concurrency}, {args.requests} requests per route')
+        print(f'{"route":<16} {"sync req/s":>11} {"async req/s":>12} {"sync p95 ms":>12} {"async p95 ms":>13}')
+        for route in READ_ROUTES:
+            if route in sync and route in async_:
+                print(f'{route:<16} {sync[route]["rps"]:11.1f} {async_[route]["rps"]:12.1f} '
+                      f'{sync[route]["p95_ms"]:12.2f} {async_[route]["p95_ms"]:13.2f}')
+
+
+if __name__ == '__main__':
+    main()
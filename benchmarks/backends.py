@@ -0,0 +1,115 @@
+"""The routes on Postgres and SQLite, loaded with the same data.
+
+Runs benchmarks.routes against each backend, each in its own process with the
+page cache off, at every --concurrency level given, and prints requests per
+second and p95 latency side by side. --sqlite FILE is run twice: as a plain
+SQLite database, and in the embedded mode (SQLITE_TUNED=1, see embedded.py)
+on a copy of the file, so the plain run keeps its rollback journal. --postgres
+URL adds a Postgres database. With --load each database, which should be
+empty, gets the schema and the same benchmarks.datagen data first.
+
+    python -m benchmarks.backends --sqlite /tmp/fyyur.db [--postgres postgresql://...]
+        [--load] [--venues 1000] [--artists 5000] [--shows 50000] [--seed 1]
+        [--requests 200] [--concurrency 1 8] [--route venues ...]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import date
+
+# Reads, then writes; the deletes remove venues the creates added
+DEFAULT_ROUTES = [
+    'index', 'venues', 'artists', 'shows', 'venues_by_genre', 'search_venues', 'site_search',
+    'suggest_artists', 'show_venue', 'show_artist', 'create_venue_submission',
+    'create_show_submission', 'edit_artist_submission', 'delete_venue',
+]
+
+
+def _env(url, tuned=False):
+    return dict(os.environ, DATABASE_URL=url, SQLITE_TUNED='1' if tuned else '0')
+
+def load(url, args):
+    # Same generator arguments, so the same rows in every database
+    subprocess.run([sys.executable, '-c', 'from app import db; db.create_all()'], env=_env(url), check=True)
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.run([sys.executable, '-m', 'benchmarks.datagen', '--venues', str(args.venues),
+                        '--artists', str(args.artists), '--shows', str(args.shows), '--seed', args.seed,
+                        '--anchor', args.anchor, '--out', directory, '--load'],
+                       env=_env(url), check=True, stdout=subprocess.DEVNULL)
+
+def tuned_copy(path):
+    # Folds any WAL back into the file and leaves it in rollback-journal
+    # mode before copying it for the embedded run
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.close()
+    root, extension = os.path.splitext(path)
+    copy = f'{root}-tuned{extension}'
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(copy + suffix):
+            os.remove(copy + suffix)
+    shutil.copyfile(path, copy)
+    return copy
+
+def run_backend(env, requests, concurrency, routes):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results.json')
+        command = [sys.executable, '-m', 'benchmarks.routes', '--requests', str(requests),
+                   '--concurrency', str(concurrency), '--no-page-cache', '--save', path]
+        for route in routes:
+            command += ['--route', route]
+        # A route that errors fails the run but still saves its results
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL)
+        with open(path) as f:
+            return json.load(f)['routes']
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sqlite', metavar='FILE', help='SQLite database file.')
+    parser.add_argument('--postgres', metavar='URL', help='Postgres database URL.')
+    parser.add_argument('--load', action='store_true', help='Create and fill the databases first.')
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--seed', default='1')
+    parser.add_argument('--anchor', default=date.today().isoformat())
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route and backend.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--route', action='append', help='Limit the run to these routes.')
+    args = parser.parse_args()
+    if not (args.sqlite or args.postgres):
+        parser.error('give --sqlite, --postgres or both')
+
+    backends = {}
+    if args.sqlite:
+        url = f'sqlite:///{os.path.abspath(args.sqlite)}'
+        if args.load:
+            load(url, args)
+        backends['sqlite'] = _env(url)
+        backends['sqlite tuned'] = _env(f'sqlite:///{tuned_copy(os.path.abspath(args.sqlite))}', tuned=True)
+    if args.postgres:
+        if args.load:
+            load(args.postgres, args)
+        backends['postgres'] = _env(args.postgres)
+
+    routes = args.route or DEFAULT_ROUTES
+    for concurrency in args.concurrency:
+        results = {name: run_backend(env, args.requests, concurrency, routes) for name, env in backends.items()}
+        print(f'\nconcurrency {concurrency}, {args.requests} requests per route; req/s and p95 ms')
+        print(f'{"route":<26}' + ''.join(f'{name:>26}' for name in backends))
+        for route in routes:
+            cells = []
+            for name in backends:
+                result = results[name].get(route)
+                cells.append('skipped' if result is None else
+                             f'{result["rps"]:.1f} / {result["p95_ms"]:.2f}' + (f' ({result["errors"]} err)' if result['errors'] else ''))
+            print(f'{route:<26}' + ''.join(f'{cell:>26}' for cell in cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Reproducible synthetic venues, artists, genres and shows.
+
+Writes venues.jsonl, artists.jsonl and shows.jsonl in the format `flask
+import-data` reads. The same arguments always produce the same files: names,
+areas, genres and show times come from a seeded generator, and show times are
+spread around --anchor (today by default) so about half of them are upcoming.
+City sizes and show activity are skewed the way real listings are, so a few
+areas, venues and artists hold most of the rows; no show double-books a venue
+or artist. With --load the files are imported into the configured database,
+which should start out empty of venues and artists; shows reference them by
+name.
+
+    python -m benchmarks.datagen [--venues 1000] [--artists 5000] [--shows 50000]
+        [--genres 19] [--seed 1] [--anchor 2030-01-01] [--out benchmarks/data] [--load]
+"""
+import argparse
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+# The genres the genre migration seeds; --genres beyond these adds 'Genre N'
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+    'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+    'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other',
+]
+STATES = ['CA', 'NY', 'TX', 'FL', 'IL', 'WA', 'TN', 'LA', 'GA', 'MA', 'CO', 'OR',
+          'PA', 'OH', 'MI', 'NC', 'AZ', 'MN', 'NV', 'MO']
+VENUE_WORDS = (['The', 'Old', 'Blue', 'Red', 'Golden', 'Electric', 'Velvet', 'Silver', 'Grand', 'Little'],
+               ['Room', 'Hall', 'Barrel', 'Lounge', 'Garage', 'Theatre', 'Tavern', 'Cellar', 'Ballroom', 'Pier'])
+ARTIST_WORDS = (['Midnight', 'Wild', 'Lonely', 'Neon', 'Broken', 'Quiet', 'Crimson', 'Paper', 'Iron', 'Lucky'],
+                ['Owls', 'Rivers', 'Hearts', 'Machines', 'Saints', 'Wolves', 'Echoes', 'Pilots', 'Tigers', 'Ghosts'])
+SHOW_SLOTS = (17, 21)
+SHOW_LENGTH = timedelta(hours=3)
+VENUE, ARTIST = 'venue', 'artist'
+
+
+def _skewed(rng, n):
+    # Index in [0, n) with small values far more likely (roughly Zipf)
+    return min(int(rng.paretovariate(1.2)) - 1, n - 1)
+
+def _name(rng, words, i):
+    first, second = words
+    return f'{rng.choice(first)} {rng.choice(second)} {i:06d}'
+
+def _genre_names(count):
+    return GENRES[:count] + [f'Genre {i}' for i in range(len(GENRES) + 1, count + 1)]
+
+def _area(rng):
+    state = STATES[_skewed(rng, len(STATES))]
+    return f'City {_skewed(rng, 40) + 1}', state
+
+def venues(rng, count, genres):
+    for i in range(count):
+        name = _name(rng, VENUE_WORDS, i)
+        city, state = _area(rng)
+        yield {
+            'name': name,
+            'city': city,
+            'state': state,
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            'facebook_link': f'https://www.facebook.com/venue{i}',
+            'image_link': f'https://example.com/venues/{i}.jpg',
+            'website_link': f'https://venue{i}.example.com',
+            'seeking_talent': rng.random() < 0.3,
+            'seeking_description': 'Looking for local acts' if rng.random() < 0.3 else None,
+            'genres': rng.sample(genres, rng.randint(1, 4)),
+        }
+
+def artists(rng, count, genres):
+    for i in range(count):
+        city, state = _area(rng)
+        yield {
+            'name': _name(rng, ARTIST_WORDS, i),
+            'city': city,
+            'state': state,
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            'facebook_link': f'https://www.facebook.com/artist{i}',
+            'image_link': f'https://example.com/artists/{i}.jpg',
+            'website_link': f'https://artist{i}.example.com',
+            'seeking_venue': rng.random() < 0.4,
+            'seeking_description': 'Looking for shows' if rng.random() < 0.4 else None,
+            'genres': rng.sample(genres, rng.randint(1, 3)),
+        }
+
+def _popular(rng, n):
+    # Milder skew than _skewed: the top 1% of n draw about 10% of picks
+    return int(n * rng.random() ** 2)
+
+def shows(rng, count, venue_names, artist_names, anchor):
+    # Three-hour shows in two evening slots; a venue or artist is booked at
+    # most once per slot, so no show double-books either
+    booked = set()
+    for _ in range(count):
+        for attempt in range(100):
+            # Popular venues and artists fill up; then spread uniformly
+            pick = _popular if attempt < 10 else lambda rng, n: rng.randrange(n)
+            venue, artist = pick(rng, len(venue_names)), pick(rng, len(artist_names))
+            day, hour = rng.randint(-365, 365), rng.choice(SHOW_SLOTS)
+            if (VENUE, venue, day, hour) not in booked and (ARTIST, artist, day, hour) not in booked:
+                break
+        else:
+            raise SystemExit('Too many shows for the venues and artists; lower --shows')
+        booked.update(((VENUE, venue, day, hour), (ARTIST, artist, day, hour)))
+        start_time = anchor + timedelta(days=day, hours=hour)
+        yield {
+            'venue_name': venue_names[venue],
+            'artist_name': artist_names[artist],
+            'start_time': start_time.isoformat(),
+            'end_time': (start_time + SHOW_LENGTH).isoformat(),
+        }
+
+def _write(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+def generate(out, venue_count, artist_count, show_count, genre_count, seed, anchor):
+    os.makedirs(out, exist_ok=True)
+    genres = _genre_names(genre_count)
+    # Separate streams so changing one count leaves the other files unchanged
+    venue_rows = list(venues(random.Random(f'{seed}:venues'), venue_count, genres))
+    artist_rows = list(artists(random.Random(f'{seed}:artists'), artist_count, genres))
+    paths = {name: os.path.join(out, f'{name}.jsonl') for name in ('venues', 'artists', 'shows')}
+    _write(paths['venues'], venue_rows)
+    _write(paths['artists'], artist_rows)
+    _write(paths['shows'], shows(random.Random(f'{seed}:shows'), show_count,
+                                 [row['name'] for row in venue_rows],
+                                 [row['name'] for row in artist_rows],
+                                 datetime.combine(anchor, datetime.min.time())))
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=5000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--genres', type=int, default=len(GENRES))
+    parser.add_argument('--seed', default='1')
+    parser.add_argument('--anchor', type=date.fromisoformat, default=date.today(),
+                        help='Show times are spread a year either side of this date.')
+    parser.add_argument('--out', default=os.path.join('benchmarks', 'data'))
+    parser.add_argument('--load', action='store_true', help='Import the files into the configured database.')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    paths = generate(args.out, args.venues, args.artists, args.shows, args.genres, args.seed, args.anchor)
+    for path in paths.values():
+        print(f'wrote {path}')
+    if args.load:
+        import importer
+        from app import app
+        with app.app_context():
+            importer.import_venues(paths['venues'], args.chunk_size, print)
+            importer.import_artists(paths['artists'], args.chunk_size, print)
+            importer.import_shows(paths['shows'], args.chunk_size, print)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Per-row cost of the show list's start time formatting.
+
+Renders pages/shows.html for N synthetic shows twice: once the way /shows
+used to feed it (start_time as text, parsed back by dateutil and formatted by
+babel.dates.format_datetime on every row) and once with native datetimes
+through the cached-pattern filter.
+
+    python -m benchmarks.datetime_filter [--rows 10000] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import app, format_datetime
+from pagination import Page
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format, locale='en')
+
+def make_shows(rows, as_text):
+    start = datetime(2030, 1, 1, 20, 30)
+    shows = []
+    for i in range(rows):
+        start_time = start + timedelta(hours=i)
+        shows.append({
+            'venue_id': i % 100,
+            'venue_name': f'Venue {i % 100}',
+            'artist_id': i % 250,
+            'artist_name': f'Artist {i % 250}',
+            'artist_image_link': 'https://example.com/artist.jpg',
+            'start_time': start_time.strftime('%Y-%m-%dT%H:%M:%S') if as_text else start_time,
+        })
+    return shows
+
+def time_render(shows, datetime_filter, repeat):
+    app.jinja_env.filters['datetime'] = datetime_filter
+    template = app.jinja_env.get_template('pages/shows.html')
+    best = float('inf')
+    with app.test_request_context('/shows'):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            template.render(shows=shows, page=Page(shows))
+            best = min(best, time.perf_counter() - started)
+    return best
+
+def time_filter(values, datetime_filter, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for value in values:
+            datetime_filter(value, 'full')
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    text_shows = make_shows(args.rows, as_text=True)
+    native_shows = make_shows(args.rows, as_text=False)
+    try:
+        results = [
+            ('filter only, text + dateutil + babel', time_filter(
+                [show['start_time'] for show in text_shows], legacy_format_datetime, args.repeat)),
+            ('filter only, native + cached pattern', time_filter(
+                [show['start_time'] for show in native_shows], format_datetime, args.repeat)),
+            ('page render, text + dateutil + babel', time_render(text_shows, legacy_format_datetime, args.repeat)),
+            ('page render, native + cached pattern', time_render(native_shows, format_datetime, args.repeat)),
+        ]
+    finally:
+        app.jinja_env.filters['datetime'] = format_datetime
+
+    print(f'{args.rows} rows, best of {args.repeat}')
+    for label, seconds in results:
+        print(f'  {label:<40} {seconds * 1000:9.1f} ms  {seconds / args.rows * 1e6:7.2f} us/row')
+
+
+if __name__ == '__main__':
+    main()
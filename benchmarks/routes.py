@@ -0,0 +1,312 @@
+"""Throughput, latency percentiles and queries per request for every route.
+
+Drives each route of app.py (listings, genre pages, search, detail pages,
+forms and the form posts, including deletes of venues and artists the run
+itself created) against the configured database, for example one filled by
+benchmarks.datagen. Requests go through the Flask test client, or to a
+running server with --url, --concurrency at a time. Ids and search terms are
+sampled from the database with a fixed seed, so runs are comparable.
+
+Queries per request are counted on the engine in test-client mode. With
+--url they are read from the Server-Timing header, which the server sends
+when started with SQL_PROFILER=1.
+
+--save writes the results as a baseline. --compare reports the change
+against one and exits non-zero when a route's p95 or queries per request
+grow by more than --tolerance. Routes answering with an error status
+also fail the run.
+
+    python -m benchmarks.routes [--requests 200] [--route show_venue ...]
+        [--concurrency 1] [--url http://127.0.0.1:5000] [--no-page-cache]
+        [--save FILE] [--compare FILE] [--tolerance 0.2]
+"""
+import argparse
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Engine
+
+from app import app, page_cache
+from cache import NullBackend
+from models import db, Venue, Artist, Genre
+
+BENCHMARK_VENUE = 'Benchmark Venue'
+BENCHMARK_ARTIST = 'Benchmark Artist'
+
+
+class Sample:
+    # Ids, names and genres drawn from the database, plus a seeded generator
+    def __init__(self, seed, size=1000):
+        self.rng = random.Random(seed)
+        self.venue_ids = self._ids(Venue, size)
+        self.artist_ids = self._ids(Artist, size)
+        self.venue_names = self._names(Venue, size)
+        self.artist_names = self._names(Artist, size)
+        self.genres = db.session.scalars(select(Genre.name).order_by(Genre.id)).all()
+        self.created = 0
+        self.deletable = {}
+        if not (self.venue_ids and self.artist_ids and self.genres):
+            raise SystemExit('The database needs venues, artists and genres; see benchmarks.datagen')
+
+    def _ids(self, model, size):
+        return db.session.scalars(select(model.id).order_by(model.id).limit(size)).all()
+
+    def _names(self, model, size):
+        return db.session.scalars(select(model.name).order_by(model.id).limit(size)).all()
+
+    def venue_id(self):
+        return self.rng.choice(self.venue_ids)
+
+    def artist_id(self):
+        return self.rng.choice(self.artist_ids)
+
+    def genre(self):
+        return urllib.parse.quote(self.rng.choice(self.genres), safe='')
+
+    def term(self, names):
+        # A word from an existing name, so searches have hits
+        return self.rng.choice(self.rng.choice(names).split())
+
+    def prefix(self, names):
+        # The start of an existing name, as typed into an autocomplete
+        name = self.rng.choice(names)
+        return name[:self.rng.randint(1, min(len(name), 8))]
+
+    def benchmark_id(self, model, prefix):
+        # Only venues and artists created by the create submissions are deleted
+        if model not in self.deletable:
+            self.deletable[model] = db.session.scalars(
+                select(model.id).where(model.name.like(f'{prefix} %')).order_by(model.id.desc())).all()
+        ids = self.deletable[model]
+        return ids.pop() if ids else None
+
+    def _entity_form(self, name):
+        return {
+            'name': name,
+            'city': 'City 1',
+            'state': 'CA',
+            'address': '1 Main St',
+            'phone': '555-555-5555',
+            'genres': self.rng.sample(self.genres, 2),
+            'facebook_link': 'https://www.facebook.com/benchmark',
+            'image_link': '',
+            'website_link': '',
+            'seeking_talent': 'False',
+            'seeking_venue': 'False',
+            'seeking_description': '',
+        }
+
+    def new_form(self, prefix):
+        self.created += 1
+        return self._entity_form(f'{prefix} {self.created}')
+
+    def edit_form(self, model, entity_id):
+        # Edits keep the name, so the sampled rows stay as they were loaded
+        name = db.session.scalar(select(model.name).where(model.id == entity_id))
+        return f'/{model.__tablename__}s/{entity_id}/edit', self._entity_form(name)
+
+    def show_form(self):
+        # Mornings, clear of the evening slots benchmarks.datagen books
+        start_time = datetime.now().replace(hour=9, minute=0) + \
+            timedelta(days=self.rng.randint(1, 365), minutes=self.rng.randrange(0, 180, 15))
+        return {'artist_id': self.artist_id(), 'venue_id': self.venue_id(),
+                'start_time': start_time.replace(second=0, microsecond=0).isoformat(), 'duration': 60}
+
+
+def _delete(model, prefix):
+    def build(sample):
+        entity_id = sample.benchmark_id(model, prefix)
+        return None if entity_id is None else ('GET', f'/{model.__tablename__}s/delete/{entity_id}', None)
+    return build
+
+# Endpoint name -> request builder returning (method, path, form data), or None
+# when there is nothing to request. Creates run before the deletes.
+ROUTES = {
+    'index': lambda s: ('GET', '/', None),
+    'venues': lambda s: ('GET', '/venues', None),
+    'artists': lambda s: ('GET', '/artists', None),
+    'shows': lambda s: ('GET', '/shows', None),
+    'venues_by_genre': lambda s: ('GET', f'/genres/{s.genre()}/venues', None),
+    'artists_by_genre': lambda s: ('GET', f'/genres/{s.genre()}/artists', None),
+    'search_venues': lambda s: ('POST', '/venues/search', {'search_term': s.term(s.venue_names)}),
+    'search_artists': lambda s: ('POST', '/artists/search', {'search_term': s.term(s.artist_names)}),
+    'site_search': lambda s: ('GET', '/search?' + urllib.parse.urlencode({'q': s.term(s.venue_names + s.artist_names)}), None),
+    'suggest_venues': lambda s: ('GET', '/api/venues/suggest?' + urllib.parse.urlencode({'q': s.prefix(s.venue_names)}), None),
+    'suggest_artists': lambda s: ('GET', '/api/artists/suggest?' + urllib.parse.urlencode({'q': s.prefix(s.artist_names)}), None),
+    'show_venue': lambda s: ('GET', f'/venues/{s.venue_id()}', None),
+    'show_artist': lambda s: ('GET', f'/artists/{s.artist_id()}', None),
+    'create_venue_form': lambda s: ('GET', '/venues/create', None),
+    'create_artist_form': lambda s: ('GET', '/artists/create', None),
+    'create_shows': lambda s: ('GET', '/shows/create', None),
+    'edit_venue': lambda s: ('GET', f'/venues/{s.venue_id()}/edit', None),
+    'edit_artist': lambda s: ('GET', f'/artists/{s.artist_id()}/edit', None),
+    'create_venue_submission': lambda s: ('POST', '/venues/create', s.new_form(BENCHMARK_VENUE)),
+    'create_artist_submission': lambda s: ('POST', '/artists/create', s.new_form(BENCHMARK_ARTIST)),
+    'create_show_submission': lambda s: ('POST', '/shows/create', s.show_form()),
+    'edit_venue_submission': lambda s: ('POST', *s.edit_form(Venue, s.venue_id())),
+    'edit_artist_submission': lambda s: ('POST', *s.edit_form(Artist, s.artist_id())),
+    'delete_venue': _delete(Venue, BENCHMARK_VENUE),
+    'delete_artist': _delete(Artist, BENCHMARK_ARTIST),
+}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of a sorted list
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+def _summary(latencies, queries, elapsed, errors):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries': None if queries is None else queries / len(latencies),
+    }
+
+def build_specs(build, sample, requests):
+    # Requests are built up front so sampling stays on this thread
+    specs = []
+    for _ in range(requests):
+        spec = build(sample)
+        if spec is None:
+            break
+        specs.append(spec)
+    return specs
+
+def _test_client_request(clients, spec):
+    if not hasattr(clients, 'client'):
+        clients.client = app.test_client()
+    method, path, data = spec
+    started = time.perf_counter()
+    response = clients.client.open(path, method=method, data=data)
+    response.get_data()
+    return time.perf_counter() - started, response.status_code, None
+
+def _http_request(base_url, spec):
+    method, path, data = spec
+    body = urllib.parse.urlencode(data, doseq=True).encode() if data is not None else None
+    request = urllib.request.Request(base_url + path, data=body, method=method)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status, timing = response.status, response.headers.get('Server-Timing', '')
+    except urllib.error.HTTPError as e:
+        status, timing = e.code, ''
+    match = re.search(r'desc="(\d+) queries"', timing)
+    return time.perf_counter() - started, status, int(match.group(1)) if match else None
+
+def run(specs, concurrency, base_url=None, counter=None):
+    if base_url:
+        send = lambda spec: _http_request(base_url, spec)
+    else:
+        clients = threading.local()
+        send = lambda spec: _test_client_request(clients, spec)
+    before = counter.count if counter is not None else 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(send, specs))
+    elapsed = time.perf_counter() - started
+    if base_url:
+        counts = [queries for _, _, queries in results]
+        queries = None if None in counts else sum(counts)
+    else:
+        queries = counter.count - before
+    return [latency for latency, _, _ in results], queries, sum(status >= 400 for _, status, _ in results), elapsed
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f'\n{"route":<26} {"p95 ms":>9} {"baseline":>9} {"change":>8} {"queries":>8} {"baseline":>9}')
+    for name, result in results.items():
+        before = baseline['routes'].get(name)
+        if before is None:
+            continue
+        change = result['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0.0
+        flags = []
+        if change > tolerance:
+            flags.append('slower')
+        if None not in (result['queries'], before['queries']) and \
+                result['queries'] > before['queries'] * (1 + tolerance) + 1e-9:
+            flags.append('more queries')
+        if flags:
+            regressions.append(name)
+        print(f'{name:<26} {result["p95_ms"]:9.2f} {before["p95_ms"]:9.2f} {change:+8.1%} '
+              f'{_format_queries(result["queries"]):>8} {_format_queries(before["queries"]):>9}  {", ".join(flags)}')
+    return regressions
+
+def _format_queries(queries):
+    return '-' if queries is None else f'{queries:.1f}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route.')
+    parser.add_argument('--route', action='append', choices=sorted(ROUTES), help='Limit the run to these routes.')
+    parser.add_argument('--url', help='Benchmark a running server instead of the test client.')
+    parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight at once.')
+    parser.add_argument('--no-page-cache', action='store_true', help='Render every page (test client only).')
+    parser.add_argument('--seed', default='1')
+    parser.add_argument('--save', metavar='FILE', help='Write the results as a baseline.')
+    parser.add_argument('--compare', metavar='FILE', help='Compare with a saved baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed growth with --compare.')
+    args = parser.parse_args()
+
+    if args.no_page_cache:
+        page_cache.backend = NullBackend()
+    counter = QueryCounter()
+    event.listen(Engine, 'before_cursor_execute', counter)
+
+    with app.app_context():
+        sample = Sample(args.seed)
+        results = {}
+        print(f'{"route":<26} {"req":>5} {"err":>4} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"queries":>8}')
+        for name in args.route or ROUTES:
+            specs = build_specs(ROUTES[name], sample, args.requests)
+            latencies, queries, errors, elapsed = run(
+                specs, args.concurrency, args.url and args.url.rstrip('/'), counter)
+            if not latencies:
+                print(f'{name:<26} skipped, nothing to request')
+                continue
+            result = results[name] = _summary(latencies, queries, elapsed, errors)
+            print(f'{name:<26} {result["requests"]:5d} {result["errors"]:4d} {result["rps"]:8.1f} {result["p50_ms"]:8.2f} '
+                  f'{result["p95_ms"]:8.2f} {result["p99_ms"]:8.2f} {_format_queries(result["queries"]):>8}')
+        database = db.engine.url.render_as_string(hide_password=True)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'database': database, 'mode': args.url or 'test client', 'requests': args.requests,
+                       'concurrency': args.concurrency, 'page_cache': not args.no_page_cache, 'routes': results}, f, indent=2)
+    failed = [name for name, result in results.items() if result['errors']]
+    if args.compare:
+        with open(args.compare) as f:
+            failed += compare(results, json.load(f), args.tolerance)
+    if failed:
+        print(f'\nFailed: {", ".join(failed)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, make_response, request, session
+from werkzeug.utils import import_string
+
+# Read-through cache for rendered pages.
+#
+# A cached view records the entities its page was built from with
+# page_cache.tag('venue:3', ...). Write handlers call
+# page_cache.invalidate(...) with the tags they touched after committing, which
+# drops exactly the pages built from that data. The backend is pluggable
+# (PAGE_CACHE_BACKEND); the default keeps pages in process memory, bounded by
+# PAGE_CACHE_MAX_BYTES with LRU eviction and a PAGE_CACHE_TTL expiry.
+#
+# invalidate() only reaches its own process's backend. Pages are therefore
+# also keyed by the ETag ConditionalGet derives from the version stamps, which
+# every writer bumps in the database: a write from another worker or from a
+# CLI command changes the ETag, and the page is rendered afresh.
+
+
+class MemoryBackend:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._keys_by_tag = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, size, value, tags = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, size, tags, ttl, generation):
+        with self._lock:
+            # A write committed while this page was rendering: it may be stale
+            if generation != self.generation or size > self.max_bytes:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value, tags)
+            self.size += size
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, tags):
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, ()):
+                    if key in self._entries:
+                        self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        expires, size, value, tags = self._entries.pop(key)
+        self.size -= size
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class NullBackend:
+    generation = 0
+
+    def __init__(self, max_bytes=0):
+        pass
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, size, tags, ttl, generation):
+        pass
+
+    def invalidate(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+class PageCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_BACKEND', 'cache.MemoryBackend')
+        app.config.setdefault('PAGE_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        app.config.setdefault('PAGE_CACHE_TTL', 300)
+        backend = app.config['PAGE_CACHE_BACKEND']
+        if isinstance(backend, str):
+            backend = import_string(backend)
+        self.backend = backend(app.config['PAGE_CACHE_MAX_BYTES'])
+        self.ttl = app.config['PAGE_CACHE_TTL']
+        app.extensions['page_cache'] = self
+
+    def tag(self, *tags):
+        g.setdefault('page_cache_tags', set()).update(tags)
+
+    def invalidate(self, *tags):
+        self.backend.invalidate(tags)
+
+    def cached(self, *tags):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Pages carrying flashed messages are per-user, and clients
+                # pinned to the primary must not see pages rendered from a
+                # lagging replica
+                if session.get('_flashes') or g.get('db_primary'):
+                    return view(*args, **kwargs)
+
+                key = request.full_path
+                if g.get('page_etag'):
+                    key = f'{key}#{g.page_etag}'
+                hit = self.backend.get(key)
+                if hit is not None:
+                    body, mimetype = hit
+                    return Response(body, mimetype=mimetype)
+
+                generation = self.backend.generation
+                self.tag(*tags)
+                response = view(*args, **kwargs)
+                response = make_response(response)
+                if response.status_code == 200 and not response.is_streamed:
+                    body = response.get_data()
+                    self.backend.set(key, (body, response.mimetype), len(body),
+                                     frozenset(g.page_cache_tags), self.ttl, generation)
+                return response
+            return wrapper
+        return decorator
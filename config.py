@@ -10,4 +10,103 @@ DEBUG = True
 
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = 'postgresql://sai@localhost:5434/fyyurapp'
+# Postgres, or a SQLite file such as sqlite:////var/lib/fyyur/fyyur.db
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://sai@localhost:5434/fyyurapp')
+
+# Per-statement limit in milliseconds on Postgres, 0 for none
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+# Embedded SQLite deployment (see embedded.py): WAL journaling, these
+# pragmas on every connection and, unless DATABASE_REPLICA_URL is set, a pool
+# of SQLITE_READ_POOL_SIZE read-only connections for the read routes. Needs
+# DATABASE_URL to name a SQLite file.
+SQLITE_TUNED = (os.environ.get('SQLITE_TUNED') == '1' and SQLALCHEMY_DATABASE_URI.startswith('sqlite')
+                and ':memory:' not in SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI != 'sqlite://')
+SQLITE_PRAGMAS = {
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    # Negative sizes are in KiB rather than pages
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'temp_store': 'MEMORY',
+}
+SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE', 8))
+SQLITE_READ_POOL = SQLITE_TUNED and SQLITE_READ_POOL_SIZE > 0 and not os.environ.get('DATABASE_REPLICA_URL')
+
+# Connection pool, applied to the primary and the replica
+def _engine_options(url):
+    if url.startswith('sqlite'):
+        # SQLite connections are local files; SQLAlchemy picks the pool
+        return {}
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        # Seconds before a connection is replaced; -1 keeps them
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+    }
+    if url.startswith('postgresql') and DB_STATEMENT_TIMEOUT_MS:
+        options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+    return options
+
+SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+
+# Optional read replica for the listing, search and detail pages (see
+# replicas.py). Clients that just wrote read from the primary for
+# REPLICA_STICKY_SECONDS.
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+SQLALCHEMY_BINDS = {}
+if DATABASE_REPLICA_URL:
+    SQLALCHEMY_BINDS['replica'] = {'url': DATABASE_REPLICA_URL, **_engine_options(DATABASE_REPLICA_URL)}
+elif SQLITE_READ_POOL:
+    SQLALCHEMY_BINDS['replica'] = {'url': SQLALCHEMY_DATABASE_URI, 'pool_size': SQLITE_READ_POOL_SIZE,
+                                   'max_overflow': 0, 'pool_timeout': 30}
+# The SQLite read pool sees every commit, so it needs no stickiness
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 0 if SQLITE_READ_POOL else 10))
+
+# Run the read routes' statements on an async engine (see aio.py). Needs
+# asyncpg (Postgres) or aiosqlite (SQLite).
+ASYNC_READS = os.environ.get('ASYNC_READS') == '1'
+
+# Number of city/state areas rendered per page of /venues
+AREAS_PER_PAGE = 20
+# Number of rows rendered per page of /artists and /shows
+PAGE_SIZE = 50
+# Venues, artists and upcoming shows on the home page feed, and how often each
+# process rebuilds it from the database (see feed.py)
+HOME_FEED_SIZE = 6
+HOME_FEED_RESEED_SECONDS = 300
+# Stream the complete /venues, /artists and /shows listings from a
+# server-side cursor instead of paging them (see streaming.py)
+STREAM_LISTINGS = os.environ.get('STREAM_LISTINGS') == '1'
+STREAM_BATCH_SIZE = 1000
+
+# Deleting a venue or artist with more shows than this removes them this
+# many per transaction first (see purge.py)
+PURGE_BATCH_SIZE = 5000
+
+# Most values listed per facet (state, city, genre) beside /venues and
+# /artists, most common first (see facets.py)
+FACET_VALUES_SHOWN = 20
+
+# Maximum number of venue/artist search hits returned, best matches first
+SEARCH_RESULTS_LIMIT = 50
+# Hits per page of the site-wide /search
+SEARCH_PAGE_SIZE = 20
+# Most suggestions a typeahead lookup returns, and how long browsers may
+# reuse them (seconds)
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_MAX_AGE = 60
+
+# Per-request SQL profiling (see profiler.py). Off unless SQL_PROFILER=1.
+SQL_PROFILER = os.environ.get('SQL_PROFILER') == '1'
+# Statements slower than this are logged with their query plan
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+# Required in the X-Admin-Token header to read /admin/sql-stats
+SQL_PROFILER_ADMIN_TOKEN = os.environ.get('SQL_PROFILER_ADMIN_TOKEN')
+
+# Rendered page cache (see cache.py): backend class, memory bound and expiry
+PAGE_CACHE_BACKEND = 'cache.MemoryBackend'
+PAGE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PAGE_CACHE_TTL = 300
@@ -0,0 +1,72 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, select, update
+from models import Venue, Artist, Show
+
+# Upcoming/past show counters denormalized onto venue and artist.
+#
+# Writers that add or remove shows adjust the counters in the same transaction
+# (add_shows / refresh_counts). Because "upcoming" depends on the clock, a
+# periodic `flask refresh-show-counts` run recounts the venues and artists
+# whose shows started since the previous run (roll_over).
+
+OWNERS = (
+    (Venue, Show.venue_id, 'venue_id'),
+    (Artist, Show.artist_id, 'artist_id'),
+)
+
+# Default window for roll_over when run hourly
+DEFAULT_LOOKBACK = timedelta(hours=2)
+
+
+def add_shows(conn, shows, now=None):
+    # shows are mappings with start_time, venue_id and artist_id
+    now = now or datetime.now()
+    for model, _, key in OWNERS:
+        upcoming, past = Counter(), Counter()
+        for show in shows:
+            (upcoming if show['start_time'] >= now else past)[int(show[key])] += 1
+        ids = upcoming.keys() | past.keys()
+        if not ids:
+            continue
+        table = model.__table__
+        conn.execute(
+            update(table)
+            .where(table.c.id == bindparam('owner_id'))
+            .values(upcoming_shows_count=table.c.upcoming_shows_count + bindparam('upcoming'),
+                    past_shows_count=table.c.past_shows_count + bindparam('past')),
+            [{'owner_id': owner_id, 'upcoming': upcoming[owner_id], 'past': past[owner_id]}
+             for owner_id in ids]
+        )
+
+def refresh_counts(conn, model, ids=None, now=None):
+    # Recount from the show table, for the given ids (a list or a subquery) or
+    # for every row; served by the (owner_id, start_time) show indexes
+    now = now or datetime.now()
+    fk = {owner: owner_fk for owner, owner_fk, _ in OWNERS}[model]
+    table = model.__table__
+    upcoming = select(func.count()).where(fk == table.c.id, Show.start_time >= now).scalar_subquery()
+    past = select(func.count()).where(fk == table.c.id, Show.start_time < now).scalar_subquery()
+    statement = update(table).values(upcoming_shows_count=upcoming, past_shows_count=past)
+    if ids is not None:
+        statement = statement.where(table.c.id.in_(ids))
+    return conn.execute(statement).rowcount
+
+def roll_over(conn, lookback, now=None):
+    # Recount owners of shows that started within lookback of now; run at an
+    # interval shorter than lookback so no show is missed. Returns the ids
+    # recounted per table.
+    now = now or datetime.now()
+    started = Show.start_time.between(now - lookback, now)
+    recounted = {}
+    for model, fk, _ in OWNERS:
+        ids = conn.execute(select(fk).where(started).distinct()).scalars().all()
+        if ids:
+            refresh_counts(conn, model, ids, now)
+        recounted[model.__tablename__] = ids
+    return recounted
+
+def refresh_all(conn, now=None):
+    now = now or datetime.now()
+    return {model.__tablename__: refresh_counts(conn, model, now=now) for model, _, _ in OWNERS}
@@ -0,0 +1,59 @@
+from sqlalchemy import event
+
+from models import db
+
+# Embedded SQLite deployment.
+#
+# With SQLITE_TUNED set and DATABASE_URL naming a SQLite file, Fyyur runs on
+# that file alone, for example on an edge kiosk with no database server:
+#  - the file is switched to WAL journaling, so readers neither block the
+#    writer nor each other, and synchronous=NORMAL, which in WAL mode survives
+#    a crash of the process and skips an fsync on every commit
+#  - every connection gets a larger page cache, memory-mapped reads, temporary
+#    tables in memory and a busy timeout, so a writer waits for another to
+#    finish rather than failing with "database is locked"
+#  - config.py registers a second pool of connections to the same file as the
+#    replica bind, set to query_only. The read routes (ReplicaRouter.reads)
+#    take their connections from it, and writes and everything else from the
+#    primary's. WAL readers see every committed write, so there is no lag to
+#    stick clients to the primary for.
+
+REPLICA_BIND = 'replica'
+
+
+class EmbeddedSQLite:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.pragmas = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQLITE_TUNED', False)
+        app.extensions['embedded_sqlite'] = self
+        self.enabled = app.config['SQLITE_TUNED']
+        if not self.enabled:
+            return
+
+        self.pragmas = app.config.get('SQLITE_PRAGMAS', {})
+        read_pool = app.config.get('SQLITE_READ_POOL', False)
+        with app.app_context():
+            for bind, engine in db.engines.items():
+                self.tune(engine, query_only=read_pool and bind == REPLICA_BIND)
+            # journal_mode is stored in the file; set it once, on a writer
+            with db.engines[None].connect() as conn:
+                conn.exec_driver_sql('PRAGMA journal_mode=WAL')
+
+    def tune(self, engine, query_only=False):
+        # Applies the pragmas to each new connection of a sync engine, or of
+        # an async engine's sync_engine
+        if engine.dialect.name != 'sqlite':
+            return
+        pragmas = dict(self.pragmas, query_only='ON' if query_only else 'OFF')
+
+        @event.listens_for(engine, 'connect')
+        def _pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+            cursor.close()
@@ -0,0 +1,96 @@
+from sqlalchemy import func, literal, select, tuple_, union_all
+from models import db, Venue, Artist, Genre, VenueGenre, ArtistGenre
+
+# Facet counts for the /venues and /artists listings.
+#
+# How many venues or artists there are per state, per city and per genre,
+# among those matching the listing's current filters. All three facets come
+# from one aggregation over the entity table left-joined to its genre rows:
+#  - Postgres: GROUP BY GROUPING SETS ((state), (state, city), (genre)), with
+#    GROUPING() telling the sets apart
+#  - SQLite, which has no GROUPING SETS: the three GROUP BYs as one UNION ALL
+#    statement
+# Counts are of distinct entities, since the genre join repeats an entity once
+# per genre. The listings are page-cached and invalidated on writes, so the
+# aggregation runs once per filter combination between writes.
+
+FILTERS = ('state', 'city', 'genre')
+GENRE_LINKS = {
+    Venue: (VenueGenre, VenueGenre.venue_id),
+    Artist: (ArtistGenre, ArtistGenre.artist_id),
+}
+
+
+def from_args(args):
+    # The filters present in a request's query string
+    return {name: args[name] for name in FILTERS if args.get(name)}
+
+def apply(query, model, filters):
+    # Restricts a query over model to the entities matching filters
+    if 'state' in filters:
+        query = query.filter(model.state == filters['state'])
+    if 'city' in filters:
+        query = query.filter(model.city == filters['city'])
+    if 'genre' in filters:
+        link, fk = GENRE_LINKS[model]
+        query = query.filter(model.id.in_(
+            select(fk).join(Genre, Genre.id == link.genre_id).where(Genre.name == filters['genre'])))
+    return query
+
+def _postgres_query(model, link, fk, filters):
+    grouping = func.grouping(model.state, model.city, Genre.name)
+    query = db.session.query(
+        grouping.label('grouping'),
+        model.state,
+        model.city,
+        Genre.name.label('genre'),
+        func.count(model.id.distinct()).label('count')
+    ).outerjoin(link, fk == model.id).outerjoin(Genre, Genre.id == link.genre_id) \
+     .group_by(func.grouping_sets(tuple_(model.state), tuple_(model.state, model.city), tuple_(Genre.name)))
+    return apply(query, model, filters)
+
+# GROUPING() of each set: a bit for each of state, city, genre not grouped on
+GROUPINGS = {0b011: 'state', 0b001: 'city', 0b110: 'genre'}
+
+def _sqlite_query(model, link, fk, filters):
+    columns = {'state': model.state, 'city': model.city, 'genre': Genre.name}
+
+    def grouped(grouping, *names):
+        query = db.session.query(
+            literal(grouping).label('grouping'),
+            *[(columns[name] if name in names else literal(None)).label(name) for name in FILTERS],
+            func.count(model.id.distinct()).label('count')
+        ).select_from(model)
+        if 'genre' in names:
+            query = query.join(link, fk == model.id).join(Genre, Genre.id == link.genre_id)
+        return apply(query, model, filters).group_by(*[columns[name] for name in names]).statement
+
+    sets = union_all(
+        grouped(0b011, 'state'),
+        grouped(0b001, 'state', 'city'),
+        grouped(0b110, 'genre'),
+    ).subquery()
+    return db.session.query(sets)
+
+def facet_counts(model, filters, fetch=None):
+    # {'state': [(state, count)], 'city': [((state, city), count)],
+    #  'genre': [(genre, count)]}, most common first
+    link, fk = GENRE_LINKS[model]
+    if db.session.get_bind().dialect.name == 'postgresql':
+        query = _postgres_query(model, link, fk, filters)
+    else:
+        query = _sqlite_query(model, link, fk, filters)
+    rows = fetch(query) if fetch is not None else query.all()
+
+    counts = {facet: [] for facet in FILTERS}
+    for row in rows:
+        facet = GROUPINGS.get(row.grouping)
+        if facet == 'state':
+            counts['state'].append((row.state, row.count))
+        elif facet == 'city':
+            counts['city'].append(((row.state, row.city), row.count))
+        elif facet == 'genre' and row.genre is not None:
+            counts['genre'].append((row.genre, row.count))
+    for values in counts.values():
+        values.sort(key=lambda item: (-item[1], item[0]))
+    return counts
@@ -0,0 +1,127 @@
+import bisect
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import select
+from models import db, Venue, Artist, Show
+
+# Home page feed: the latest listed venues and artists and the next upcoming
+# shows.
+#
+# The feed lives in process memory and costs the same to render however much
+# is listed. It is seeded from the database on first use. After that the
+# create handlers add what they list after committing: new venues and artists
+# go on the front of bounded deques, and new shows are merged into a window of
+# the soonest upcoming ones. Edits and deletes mark the feed stale, and it is
+# reseeded on next use. Each process keeps its own feed and reseeds it every
+# HOME_FEED_RESEED_SECONDS, so listings made through another process or the
+# CLI show up within that time.
+
+
+def _shows():
+    return select(Show.id, Show.start_time, Show.venue_id, Venue.name.label('venue_name'),
+                  Show.artist_id, Artist.name.label('artist_name'), Artist.image_link.label('artist_image_link')) \
+        .join(Venue, Venue.id == Show.venue_id).join(Artist, Artist.id == Show.artist_id)
+
+
+class HomeFeed:
+    def __init__(self, app=None):
+        self.size = 6
+        self.window = 24
+        self.reseed_seconds = 300
+        self.venues = deque()
+        self.artists = deque()
+        # (start_time, show id, item), soonest first
+        self.shows = []
+        # Whether every upcoming show is in self.shows, not just the soonest
+        self.shows_complete = False
+        self.seeded_at = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('HOME_FEED_SIZE', 6)
+        app.config.setdefault('HOME_FEED_RESEED_SECONDS', 300)
+        app.extensions['home_feed'] = self
+        self.size = app.config['HOME_FEED_SIZE']
+        # Upcoming shows held beyond those shown, so shows starting do not
+        # empty the feed before the next reseed
+        self.window = self.size * 4
+        self.reseed_seconds = app.config['HOME_FEED_RESEED_SECONDS']
+        self.venues = deque(maxlen=self.size)
+        self.artists = deque(maxlen=self.size)
+        app.jinja_env.globals['home_feed'] = self.snapshot
+
+    def _seed(self, now):
+        venues = db.session.execute(
+            select(Venue.id, Venue.name, Venue.city, Venue.state, Venue.image_link)
+            .order_by(Venue.id.desc()).limit(self.size)).all()
+        artists = db.session.execute(
+            select(Artist.id, Artist.name, Artist.city, Artist.state, Artist.image_link)
+            .order_by(Artist.id.desc()).limit(self.size)).all()
+        shows = db.session.execute(
+            _shows().where(Show.start_time > now)
+            .order_by(Show.start_time, Show.id).limit(self.window)).all()
+        self.venues = deque((row._asdict() for row in venues), maxlen=self.size)
+        self.artists = deque((row._asdict() for row in artists), maxlen=self.size)
+        self.shows = [(row.start_time, row.id, row._asdict()) for row in shows]
+        self.shows_complete = len(shows) < self.window
+        self.seeded_at = time.monotonic()
+
+    def _stale(self, now):
+        if self.seeded_at is None or time.monotonic() - self.seeded_at > self.reseed_seconds:
+            return True
+        # Started shows leave the window; refill it before it runs short
+        started = bisect.bisect_right(self.shows, (now, float('inf')))
+        del self.shows[:started]
+        return len(self.shows) < self.size and not self.shows_complete
+
+    def snapshot(self):
+        now = datetime.now()
+        with self._lock:
+            if self._stale(now):
+                self._seed(now)
+            return {
+                'venues': list(self.venues),
+                'artists': list(self.artists),
+                'shows': [item for _, _, item in self.shows[:self.size]],
+            }
+
+    def listed(self, model, entity):
+        # A venue or artist was created; entity is the committed instance
+        item = {'id': entity.id, 'name': entity.name, 'city': entity.city,
+                'state': entity.state, 'image_link': entity.image_link}
+        with self._lock:
+            if self.seeded_at is not None:
+                (self.venues if model is Venue else self.artists).appendleft(item)
+
+    def scheduled(self, rows):
+        # Shows were created; rows as returned by scheduling.schedule, with ids
+        # looked up for the ones that make the window
+        now = datetime.now()
+        with self._lock:
+            if self.seeded_at is None:
+                return
+            last = self.shows[-1][0] if self.shows and not self.shows_complete else None
+            rows = [row for row in rows if row['start_time'] > now and (last is None or row['start_time'] < last)]
+        if not rows:
+            return
+        shows = db.session.execute(
+            _shows().where(Show.venue_id.in_({row['venue_id'] for row in rows}),
+                           Show.start_time.in_({row['start_time'] for row in rows}))).all()
+        with self._lock:
+            known = {show_id for _, show_id, _ in self.shows}
+            for row in shows:
+                if row.id not in known:
+                    bisect.insort(self.shows, (row.start_time, row.id, row._asdict()))
+            if len(self.shows) > self.window:
+                del self.shows[self.window:]
+                self.shows_complete = False
+
+    def changed(self):
+        # An edit or delete: reseed on next use
+        with self._lock:
+            self.seeded_at = None
@@ -0,0 +1,167 @@
+from datetime import datetime
+
+from sqlalchemy import DDL, DateTime, Integer, and_, column, event, func, literal, literal_column, or_, select, table, union_all
+from models import db, Venue, Artist, Show, VenueGenre, ArtistGenre
+
+# Site-wide search over venues, artists and their upcoming shows.
+#
+# A venue or artist matches on its name, city and state, genres and seeking
+# description, weighted in that order; a show matches through its artist or
+# venue and ranks below them. The searchable text is maintained by the
+# database as it changes, including when genre rows come and go:
+#  - Postgres: a search_vector tsvector column on venue and artist with a GIN
+#    index, set by a BEFORE trigger on the entity. Statement-level triggers on
+#    the genre tables have it recomputed. Queries are parsed by
+#    websearch_to_tsquery and ranked by ts_rank_cd.
+#  - SQLite: one FTS5 table, search_fts, with a row per venue and artist kept
+#    current by triggers. Every word must match and rows are ranked by bm25.
+# Both use unstemmed, lowercased words, so the same query finds the same rows.
+
+OWNERS = {
+    'venue': (Venue, VenueGenre),
+    'artist': (Artist, ArtistGenre),
+}
+# Offsets of venue and artist rows in search_fts: rowid = id * 2 + offset
+SQLITE_ROWID_OFFSET = {'venue': 0, 'artist': 1}
+# A show ranks at this fraction of its best-matching participant
+SHOW_RANK = 0.5
+
+
+def _postgres_ddl(owner):
+    genres = (f"(SELECT string_agg(g.name, ' ') FROM {owner}_genre l JOIN genre g ON g.id = l.genre_id "
+              f'WHERE l.{owner}_id = NEW.id)')
+    return [
+        f'ALTER TABLE {owner} ADD COLUMN IF NOT EXISTS search_vector tsvector',
+        f'CREATE INDEX IF NOT EXISTS ix_{owner}_search_vector ON {owner} USING gin (search_vector)',
+        f"""CREATE OR REPLACE FUNCTION {owner}_search_vector() RETURNS trigger AS $$
+BEGIN
+  NEW.search_vector :=
+    setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce({genres}, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(NEW.seeking_description, '')), 'C');
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql""",
+        # Setting search_vector to NULL, as the genre triggers do, recomputes it
+        f'DROP TRIGGER IF EXISTS {owner}_search_vector ON {owner}',
+        f'CREATE TRIGGER {owner}_search_vector BEFORE INSERT OR UPDATE OF name, city, state, seeking_description, '
+        f'search_vector ON {owner} FOR EACH ROW EXECUTE FUNCTION {owner}_search_vector()',
+        f"""CREATE OR REPLACE FUNCTION {owner}_genre_search_vector() RETURNS trigger AS $$
+BEGIN
+  UPDATE {owner} SET search_vector = NULL WHERE id IN (SELECT {owner}_id FROM changed);
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql""",
+        f'DROP TRIGGER IF EXISTS {owner}_genre_search_vector_insert ON {owner}_genre',
+        f'CREATE TRIGGER {owner}_genre_search_vector_insert AFTER INSERT ON {owner}_genre '
+        f'REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION {owner}_genre_search_vector()',
+        f'DROP TRIGGER IF EXISTS {owner}_genre_search_vector_delete ON {owner}_genre',
+        f'CREATE TRIGGER {owner}_genre_search_vector_delete AFTER DELETE ON {owner}_genre '
+        f'REFERENCING OLD TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION {owner}_genre_search_vector()',
+    ]
+
+def _sqlite_document(owner, entity_id):
+    # Statements replacing the entity's search_fts row, if the entity exists
+    offset = SQLITE_ROWID_OFFSET[owner]
+    return (
+        f'DELETE FROM search_fts WHERE rowid = {entity_id} * 2 + {offset}; '
+        f'INSERT INTO search_fts(rowid, kind, entity_id, name, place, genres, description) '
+        f"SELECT e.id * 2 + {offset}, '{owner}', e.id, e.name, e.city || ' ' || e.state, "
+        f"coalesce((SELECT group_concat(g.name, ' ') FROM {owner}_genre l JOIN genre g ON g.id = l.genre_id "
+        f"WHERE l.{owner}_id = e.id), ''), coalesce(e.seeking_description, '') "
+        f'FROM {owner} e WHERE e.id = {entity_id};'
+    )
+
+SQLITE_TABLE = ("CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+                "kind UNINDEXED, entity_id UNINDEXED, name, place, genres, description, "
+                "tokenize='unicode61 remove_diacritics 2')")
+
+def _sqlite_ddl(owner):
+    offset = SQLITE_ROWID_OFFSET[owner]
+    return [
+        SQLITE_TABLE,
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_ai AFTER INSERT ON {owner} BEGIN '
+        f'{_sqlite_document(owner, "NEW.id")} END',
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_au AFTER UPDATE OF name, city, state, seeking_description '
+        f'ON {owner} BEGIN {_sqlite_document(owner, "NEW.id")} END',
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_ad AFTER DELETE ON {owner} BEGIN '
+        f'DELETE FROM search_fts WHERE rowid = OLD.id * 2 + {offset}; END',
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_genre_ai AFTER INSERT ON {owner}_genre BEGIN '
+        f'{_sqlite_document(owner, f"NEW.{owner}_id")} END',
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_genre_ad AFTER DELETE ON {owner}_genre BEGIN '
+        f'{_sqlite_document(owner, f"OLD.{owner}_id")} END',
+    ]
+
+# Migrations install these on existing databases; the listeners cover
+# databases built with db.create_all(). They hang off the genre tables, which
+# are created after the venue, artist and genre tables they refer to.
+for _owner, (_model, _genre_model) in OWNERS.items():
+    for _statement in _postgres_ddl(_owner):
+        event.listen(_genre_model.__table__, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+    for _statement in _sqlite_ddl(_owner):
+        event.listen(_genre_model.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Venue.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS search_fts').execute_if(dialect='sqlite'))
+
+
+def _sqlite_match(term):
+    # Every word must appear; each is quoted so FTS5 syntax in the term is
+    # taken literally
+    return ' '.join('"' + word.replace('"', '""') + '"' for word in term.split())
+
+def _matches(term, dialect):
+    # (kind, id, rank) of each matching venue and artist, higher ranks better
+    if dialect == 'postgresql':
+        # The configuration as a literal; as a bind parameter it would be text
+        query = func.websearch_to_tsquery(literal_column("'simple'::regconfig"), term)
+        selects = []
+        for owner, (model, _) in OWNERS.items():
+            vector = literal_column(f'{owner}.search_vector')
+            selects.append(select(literal(owner).label('kind'), model.id.label('id'),
+                                  func.ts_rank_cd(vector, query).label('rank'))
+                           .select_from(model).where(vector.op('@@')(query)))
+        return union_all(*selects).cte('matched')
+
+    fts = table('search_fts', column('kind'), column('entity_id'))
+    document = literal_column('search_fts')
+    # bm25 is lower for better matches; weights follow the column order
+    rank = -func.bm25(document, 0.0, 0.0, 10.0, 4.0, 4.0, 1.0)
+    return select(fts.c.kind.label('kind'), fts.c.entity_id.label('id'), rank.label('rank')) \
+        .where(document.op('MATCH')(_sqlite_match(term))).cte('matched')
+
+def search_all(term, limit, offset=0, fetch=None):
+    # One page of hits, best first: rows with kind ('venue', 'artist' or
+    # 'show'), id, name, detail, start_time, artist_id, venue_id and rank.
+    # Returns up to limit + 1 rows so callers can tell if there is a next page.
+    term = term.strip()
+    if not term:
+        return []
+    dialect = db.session.get_bind().dialect.name
+    matched = _matches(term, dialect)
+
+    entities = [
+        select(literal(owner).label('kind'), model.id.label('id'), model.name.label('name'),
+               (model.city + ', ' + model.state).label('detail'), literal(None, DateTime).label('start_time'),
+               literal(None, Integer).label('artist_id'), literal(None, Integer).label('venue_id'),
+               matched.c.rank.label('rank'))
+        .join(matched, and_(matched.c.kind == owner, matched.c.id == model.id))
+        for owner, (model, _) in OWNERS.items()
+    ]
+    # Upcoming shows of the matching venues and artists, each once, ranked by
+    # its better-matching participant
+    shows = select(
+        literal('show').label('kind'), Show.id.label('id'), Artist.name.label('name'),
+        Venue.name.label('detail'), Show.start_time.label('start_time'),
+        Show.artist_id.label('artist_id'), Show.venue_id.label('venue_id'),
+        (func.max(matched.c.rank) * SHOW_RANK).label('rank')
+    ).join(matched, or_(and_(matched.c.kind == 'artist', Show.artist_id == matched.c.id),
+                        and_(matched.c.kind == 'venue', Show.venue_id == matched.c.id))) \
+     .join(Artist, Artist.id == Show.artist_id).join(Venue, Venue.id == Show.venue_id) \
+     .where(Show.start_time > datetime.now()) \
+     .group_by(Show.id, Artist.name, Venue.name, Show.start_time, Show.artist_id, Show.venue_id)
+
+    hits = union_all(*entities, shows).subquery('hits')
+    query = db.session.query(hits) \
+        .order_by(hits.c.rank.desc(), hits.c.kind, hits.c.start_time, hits.c.id) \
+        .limit(limit + 1).offset(offset)
+    return fetch(query) if fetch is not None else query.all()
@@ -0,0 +1,219 @@
+import csv
+import io
+import json
+import time
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+import counters
+import scheduling
+import versions
+from models import db, Venue, Artist, Show, Genre, VenueGenre, ArtistGenre
+
+# Bulk loading for `flask import-data`.
+#
+# Input files are CSV (with a header row) or JSONL, picked by extension. Rows
+# are written in chunks, one transaction per chunk, as multi-row INSERTs; shows
+# go through COPY on Postgres. Genres may be given as a list (JSONL) or a
+# ';'-separated string (CSV); names missing from the genre table are added.
+# Shows reference their venue and artist either by venue_id/artist_id or by
+# venue_name/artist_name, resolved in bulk. A show without an end_time lasts
+# scheduling.DEFAULT_DURATION; a chunk that double-books a venue or artist is
+# rejected as a whole.
+
+VENUE_FIELDS = ('name', 'city', 'state', 'phone', 'facebook_link', 'image_link',
+                'website_link', 'seeking_talent', 'seeking_description')
+ARTIST_FIELDS = ('name', 'city', 'state', 'phone', 'facebook_link', 'image_link',
+                 'website_link', 'seeking_venue', 'seeking_description')
+BOOLEAN_FIELDS = ('seeking_talent', 'seeking_venue')
+
+
+class DataImportError(Exception):
+    pass
+
+
+def read_records(path):
+    if path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    else:
+        raise DataImportError(f'{path}: expected a .csv or .jsonl file')
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _boolean(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y', 't')
+    return bool(value)
+
+def _genres(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [genre.strip() for genre in value.split(';') if genre.strip()]
+    return list(value)
+
+def _row(record, fields):
+    row = {field: record.get(field) or None for field in fields}
+    for field in BOOLEAN_FIELDS:
+        if field in row:
+            row[field] = _boolean(row[field])
+    return row
+
+def _start_time(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+
+class Progress:
+    def __init__(self, label, echo):
+        self.label = label
+        self.echo = echo
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def advance(self, rows):
+        self.rows += rows
+        self.echo(f'{self.label}: {self.rows} rows ({self.rate:,.0f} rows/s)')
+
+    @property
+    def rate(self):
+        return self.rows / max(time.perf_counter() - self.started, 1e-9)
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        self.echo(f'{self.label}: imported {self.rows} rows in {elapsed:.2f}s ({self.rate:,.0f} rows/s)')
+
+
+class GenreResolver:
+    # Maps genre names to ids, adding the names the lookup table lacks
+    def __init__(self):
+        self.ids = {}
+
+    def resolve(self, conn, names):
+        missing = {name for name in names if name not in self.ids}
+        if missing:
+            self.ids.update(conn.execute(
+                select(Genre.name, Genre.id).where(Genre.name.in_(missing))).all())
+            new = sorted(missing - self.ids.keys())
+            if new:
+                rows = conn.execute(insert(Genre.__table__).returning(Genre.name, Genre.id),
+                                    [{'name': name} for name in new])
+                self.ids.update(rows.all())
+                # The app reloads its genre lookup and form choices
+                versions.bump(conn, 'genres')
+        return self.ids
+
+
+def _import_entities(path, model, fields, genre_model, genre_fk, chunk_size, echo):
+    progress = Progress(model.__tablename__, echo)
+    entity_insert = insert(model.__table__).returning(model.id, sort_by_parameter_order=True)
+    genres = GenreResolver()
+    for chunk in chunked(read_records(path), chunk_size):
+        chunk_genres = [set(_genres(record.get('genres'))) for record in chunk]
+        with db.engine.begin() as conn:
+            genre_ids = genres.resolve(conn, set().union(*chunk_genres))
+            ids = conn.execute(entity_insert, [_row(record, fields) for record in chunk]).scalars().all()
+            genre_rows = [{'genre_id': genre_ids[genre], genre_fk: entity_id}
+                          for entity_id, names in zip(ids, chunk_genres)
+                          for genre in names]
+            if genre_rows:
+                conn.execute(insert(genre_model.__table__), genre_rows)
+            versions.bump(conn, f'{model.__tablename__}s')
+        progress.advance(len(chunk))
+    progress.finish()
+
+def import_venues(path, chunk_size, echo):
+    _import_entities(path, Venue, VENUE_FIELDS, VenueGenre, 'venue_id', chunk_size, echo)
+
+def import_artists(path, chunk_size, echo):
+    _import_entities(path, Artist, ARTIST_FIELDS, ArtistGenre, 'artist_id', chunk_size, echo)
+
+
+class KeyResolver:
+    # Maps names to ids with one query per chunk for the names not seen yet
+    def __init__(self, model):
+        self.model = model
+        self.ids = {}
+
+    def resolve(self, conn, names):
+        missing = {name for name in names if name not in self.ids}
+        if missing:
+            rows = conn.execute(
+                select(self.model.name, self.model.id)
+                .where(self.model.name.in_(missing))
+                .order_by(self.model.id.desc())
+            )
+            # Lowest id wins when a name is listed more than once
+            self.ids.update({name: entity_id for name, entity_id in rows})
+
+    def __getitem__(self, name):
+        try:
+            return self.ids[name]
+        except KeyError:
+            raise DataImportError(f'unknown {self.model.__tablename__} {name!r}') from None
+
+
+def _show_rows(conn, chunk, venues, artists):
+    venues.resolve(conn, [record['venue_name'] for record in chunk if not record.get('venue_id')])
+    artists.resolve(conn, [record['artist_name'] for record in chunk if not record.get('artist_id')])
+    rows = []
+    for record in chunk:
+        start_time = _start_time(record['start_time'])
+        rows.append({
+            'start_time': start_time,
+            'end_time': _start_time(record['end_time']) if record.get('end_time')
+                        else start_time + scheduling.DEFAULT_DURATION,
+            'venue_id': int(record['venue_id']) if record.get('venue_id') else venues[record['venue_name']],
+            'artist_id': int(record['artist_id']) if record.get('artist_id') else artists[record['artist_name']],
+        })
+    return rows
+
+def _copy_shows(conn, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow((row['start_time'].isoformat(), row['end_time'].isoformat(), row['artist_id'], row['venue_id']))
+    buffer.seek(0)
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert('COPY "show" (start_time, end_time, artist_id, venue_id) FROM STDIN WITH (FORMAT csv)', buffer)
+    finally:
+        cursor.close()
+
+def import_shows(path, chunk_size, echo):
+    progress = Progress('show', echo)
+    venues, artists = KeyResolver(Venue), KeyResolver(Artist)
+    for chunk in chunked(read_records(path), chunk_size):
+        with db.engine.begin() as conn:
+            rows = _show_rows(conn, chunk, venues, artists)
+            try:
+                if conn.dialect.name == 'postgresql' and conn.dialect.driver == 'psycopg2':
+                    _copy_shows(conn, rows)
+                else:
+                    conn.execute(insert(Show.__table__), rows)
+            except (IntegrityError, conn.dialect.loaded_dbapi.IntegrityError) as e:
+                # COPY raises the driver's error rather than SQLAlchemy's
+                owner = scheduling.conflict_owner(e)
+                if owner is None:
+                    raise
+                raise DataImportError(f'rows {progress.rows + 1}-{progress.rows + len(chunk)}: '
+                                      f'a show double-books its {owner}') from None
+            counters.add_shows(conn, rows)
+            versions.bump(conn, 'shows',
+                          *{f"venue:{row['venue_id']}" for row in rows},
+                          *{f"artist:{row['artist_id']}" for row in rows})
+        progress.advance(len(chunk))
+    progress.finish()
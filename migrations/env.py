@@ -5,6 +5,8 @@ from flask import current_app
 
 from alembic import context
 
+import online_migrations
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -96,7 +98,20 @@ def run_migrations_online():
 
     connectable = get_engine()
 
+    dry_run = context.get_x_argument(as_dictionary=True).get('dry_run') == '1'
+
     with connectable.connect() as connection:
+        if dry_run:
+            # -x dry_run=1: a transaction begun before configuring the context
+            # is one Alembic leaves alone, so nothing commits and it is rolled
+            # back below; see online_migrations.py
+            transaction = connection.begin()
+            if connection.dialect.name == 'sqlite':
+                # pysqlite only opens a transaction before DML, and DDL
+                # outside one could not be rolled back
+                connection.connection.driver_connection.isolation_level = None
+                connection.exec_driver_sql('BEGIN')
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -106,6 +121,13 @@ def run_migrations_online():
         with context.begin_transaction():
             context.run_migrations()
 
+        if dry_run:
+            transaction.rollback()
+
+    # Timings of the steps run through online_migrations
+    for line in online_migrations.report():
+        print(line)
+
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,129 @@
+"""site-wide search vectors and FTS5 table
+
+Revision ID: 9d3f61c2b7e4
+Revises: e2b7a4f90c16
+Create Date: 2026-10-18 21:37:05.883120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f61c2b7e4'
+down_revision = 'e2b7a4f90c16'
+branch_labels = None
+depends_on = None
+
+OWNERS = ('venue', 'artist')
+SQLITE_ROWID_OFFSET = {'venue': 0, 'artist': 1}
+
+
+def _postgres_ddl(owner):
+    genres = (f"(SELECT string_agg(g.name, ' ') FROM {owner}_genre l JOIN genre g ON g.id = l.genre_id "
+              f'WHERE l.{owner}_id = NEW.id)')
+    return [
+        f'ALTER TABLE {owner} ADD COLUMN IF NOT EXISTS search_vector tsvector',
+        f'CREATE INDEX IF NOT EXISTS ix_{owner}_search_vector ON {owner} USING gin (search_vector)',
+        f"""CREATE OR REPLACE FUNCTION {owner}_search_vector() RETURNS trigger AS $$
+BEGIN
+  NEW.search_vector :=
+    setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(NEW.city, '') || ' ' || coalesce(NEW.state, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce({genres}, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(NEW.seeking_description, '')), 'C');
+  RETURN NEW;
+END
+$$ LANGUAGE plpgsql""",
+        # Setting search_vector to NULL, as the genre triggers do, recomputes it
+        f'DROP TRIGGER IF EXISTS {owner}_search_vector ON {owner}',
+        f'CREATE TRIGGER {owner}_search_vector BEFORE INSERT OR UPDATE OF name, city, state, seeking_description, '
+        f'search_vector ON {owner} FOR EACH ROW EXECUTE FUNCTION {owner}_search_vector()',
+        f"""CREATE OR REPLACE FUNCTION {owner}_genre_search_vector() RETURNS trigger AS $$
+BEGIN
+  UPDATE {owner} SET search_vector = NULL WHERE id IN (SELECT {owner}_id FROM changed);
+  RETURN NULL;
+END
+$$ LANGUAGE plpgsql""",
+        f'DROP TRIGGER IF EXISTS {owner}_genre_search_vector_insert ON {owner}_genre',
+        f'CREATE TRIGGER {owner}_genre_search_vector_insert AFTER INSERT ON {owner}_genre '
+        f'REFERENCING NEW TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION {owner}_genre_search_vector()',
+        f'DROP TRIGGER IF EXISTS {owner}_genre_search_vector_delete ON {owner}_genre',
+        f'CREATE TRIGGER {owner}_genre_search_vector_delete AFTER DELETE ON {owner}_genre '
+        f'REFERENCING OLD TABLE AS changed FOR EACH STATEMENT EXECUTE FUNCTION {owner}_genre_search_vector()',
+    ]
+
+def _sqlite_document(owner, entity_id):
+    # Statements replacing the entity's search_fts row, if the entity exists
+    offset = SQLITE_ROWID_OFFSET[owner]
+    return (
+        f'DELETE FROM search_fts WHERE rowid = {entity_id} * 2 + {offset}; '
+        f'INSERT INTO search_fts(rowid, kind, entity_id, name, place, genres, description) '
+        f"SELECT e.id * 2 + {offset}, '{owner}', e.id, e.name, e.city || ' ' || e.state, "
+        f"coalesce((SELECT group_concat(g.name, ' ') FROM {owner}_genre l JOIN genre g ON g.id = l.genre_id "
+        f"WHERE l.{owner}_id = e.id), ''), coalesce(e.seeking_description, '') "
+        f'FROM {owner} e WHERE e.id = {entity_id};'
+    )
+
+def _sqlite_fill(owner):
+    # A search_fts row for every existing entity
+    offset = SQLITE_ROWID_OFFSET[owner]
+    return (
+        f'INSERT INTO search_fts(rowid, kind, entity_id, name, place, genres, description) '
+        f"SELECT e.id * 2 + {offset}, '{owner}', e.id, e.name, e.city || ' ' || e.state, "
+        f"coalesce((SELECT group_concat(g.name, ' ') FROM {owner}_genre l JOIN genre g ON g.id = l.genre_id "
+        f"WHERE l.{owner}_id = e.id), ''), coalesce(e.seeking_description, '') "
+        f'FROM {owner} e'
+    )
+
+SQLITE_TABLE = ("CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+                "kind UNINDEXED, entity_id UNINDEXED, name, place, genres, description, "
+                "tokenize='unicode61 remove_diacritics 2')")
+
+def _sqlite_ddl(owner):
+    offset = SQLITE_ROWID_OFFSET[owner]
+    return [
+        SQLITE_TABLE,
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_ai AFTER INSERT ON {owner} BEGIN '
+        f'{_sqlite_document(owner, "NEW.id")} END',
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_au AFTER UPDATE OF name, city, state, seeking_description '
+        f'ON {owner} BEGIN {_sqlite_document(owner, "NEW.id")} END',
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_ad AFTER DELETE ON {owner} BEGIN '
+        f'DELETE FROM search_fts WHERE rowid = OLD.id * 2 + {offset}; END',
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_genre_ai AFTER INSERT ON {owner}_genre BEGIN '
+        f'{_sqlite_document(owner, f"NEW.{owner}_id")} END',
+        f'CREATE TRIGGER IF NOT EXISTS search_fts_{owner}_genre_ad AFTER DELETE ON {owner}_genre BEGIN '
+        f'{_sqlite_document(owner, f"OLD.{owner}_id")} END',
+    ]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for owner in OWNERS:
+        if dialect == 'postgresql':
+            for statement in _postgres_ddl(owner):
+                op.execute(statement)
+            # Setting the vector to NULL has the trigger compute it
+            op.execute(f'UPDATE {owner} SET search_vector = NULL')
+        elif dialect == 'sqlite':
+            for statement in _sqlite_ddl(owner):
+                op.execute(statement)
+            op.execute(_sqlite_fill(owner))
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for owner in OWNERS:
+        if dialect == 'postgresql':
+            op.execute(f'DROP TRIGGER IF EXISTS {owner}_genre_search_vector_insert ON {owner}_genre')
+            op.execute(f'DROP TRIGGER IF EXISTS {owner}_genre_search_vector_delete ON {owner}_genre')
+            op.execute(f'DROP TRIGGER IF EXISTS {owner}_search_vector ON {owner}')
+            op.execute(f'DROP FUNCTION IF EXISTS {owner}_genre_search_vector()')
+            op.execute(f'DROP FUNCTION IF EXISTS {owner}_search_vector()')
+            op.execute(f'DROP INDEX IF EXISTS ix_{owner}_search_vector')
+            op.execute(f'ALTER TABLE {owner} DROP COLUMN IF EXISTS search_vector')
+        elif dialect == 'sqlite':
+            for suffix in ('ai', 'au', 'ad', 'genre_ai', 'genre_ad'):
+                op.execute(f'DROP TRIGGER IF EXISTS search_fts_{owner}_{suffix}')
+    if dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS search_fts')
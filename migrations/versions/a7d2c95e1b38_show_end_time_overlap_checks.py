@@ -0,0 +1,67 @@
+"""show end time and overlap checks
+
+Revision ID: a7d2c95e1b38
+Revises: f1a84c2d6e53
+Create Date: 2026-10-18 17:41:09.318264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d2c95e1b38'
+down_revision = 'f1a84c2d6e53'
+branch_labels = None
+depends_on = None
+
+OWNERS = ('venue', 'artist')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    online.add_column('show', sa.Column('end_time', sa.DateTime(), nullable=True))
+
+    # Existing shows get the default three hours
+    online.backfill('show', 'end_time', {
+        'sqlite': "strftime('%Y-%m-%d %H:%M:%S', start_time, '+3 hours') || '.000000'",
+        'postgresql': "start_time + interval '3 hours'",
+    })
+    online.set_not_null('show', 'end_time', sa.DateTime())
+    online.add_check_constraint('ck_show_end_time', 'show', 'end_time > start_time')
+
+    # Fails if the existing shows already double-book a venue or artist; those
+    # have to be moved or removed first
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for owner in OWNERS:
+            online.add_exclusion_constraint(f'ex_show_{owner}_overlap', 'show',
+                                            f'{owner}_id WITH =, tsrange(start_time, end_time) WITH &&')
+    elif dialect == 'sqlite':
+        for owner in OWNERS:
+            overlap = (f"SELECT RAISE(ABORT, 'ex_show_{owner}_overlap') FROM \"show\" "
+                       f'WHERE {owner}_id = NEW.{owner}_id AND end_time > NEW.start_time AND start_time < NEW.end_time')
+            online.create_index(f'ix_show_{owner}_id_end_time', 'show', [f'{owner}_id', 'end_time'])
+            op.execute(f'CREATE TRIGGER ex_show_{owner}_overlap_insert BEFORE INSERT ON "show" '
+                       f'BEGIN {overlap}; END')
+            op.execute(f'CREATE TRIGGER ex_show_{owner}_overlap_update '
+                       f'BEFORE UPDATE OF {owner}_id, start_time, end_time ON "show" '
+                       f'BEGIN {overlap} AND id != NEW.id; END')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for owner in OWNERS:
+            op.execute(f'ALTER TABLE "show" DROP CONSTRAINT IF EXISTS ex_show_{owner}_overlap')
+    elif dialect == 'sqlite':
+        for owner in OWNERS:
+            op.execute(f'DROP TRIGGER IF EXISTS ex_show_{owner}_overlap_update')
+            op.execute(f'DROP TRIGGER IF EXISTS ex_show_{owner}_overlap_insert')
+            op.execute(f'DROP INDEX IF EXISTS ix_show_{owner}_id_end_time')
+
+    with op.batch_alter_table('show', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_show_end_time', type_='check')
+        batch_op.drop_column('end_time')
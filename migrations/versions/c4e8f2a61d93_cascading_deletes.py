@@ -0,0 +1,73 @@
+"""cascade deletes from venues and artists to their shows and genres
+
+Revision ID: c4e8f2a61d93
+Revises: a7d2c95e1b38
+Create Date: 2026-10-18 19:02:47.511930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8f2a61d93'
+down_revision = 'a7d2c95e1b38'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table)
+FOREIGN_KEYS = [
+    ('show', 'venue_id', 'venue'),
+    ('show', 'artist_id', 'artist'),
+    ('venue_genre', 'venue_id', 'venue'),
+    ('artist_genre', 'artist_id', 'artist'),
+]
+# Names for SQLite's unnamed foreign keys, so batch mode can replace them
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+OWNERS = ('venue', 'artist')
+
+
+def _sqlite_overlap_triggers():
+    # Recreating "show" drops its triggers; these are a7d2c95e1b38's
+    for owner in OWNERS:
+        overlap = (f"SELECT RAISE(ABORT, 'ex_show_{owner}_overlap') FROM \"show\" "
+                   f'WHERE {owner}_id = NEW.{owner}_id AND end_time > NEW.start_time AND start_time < NEW.end_time')
+        op.execute(f'DROP TRIGGER IF EXISTS ex_show_{owner}_overlap_insert')
+        op.execute(f'DROP TRIGGER IF EXISTS ex_show_{owner}_overlap_update')
+        op.execute(f'CREATE TRIGGER ex_show_{owner}_overlap_insert BEFORE INSERT ON "show" '
+                   f'BEGIN {overlap}; END')
+        op.execute(f'CREATE TRIGGER ex_show_{owner}_overlap_update '
+                   f'BEFORE UPDATE OF {owner}_id, start_time, end_time ON "show" '
+                   f'BEGIN {overlap} AND id != NEW.id; END')
+
+def _replace_foreign_keys(ondelete):
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for table in ('show', 'venue_genre', 'artist_genre'):
+            with op.batch_alter_table(table, recreate='always', naming_convention=NAMING_CONVENTION) as batch_op:
+                for fk_table, column, referred in FOREIGN_KEYS:
+                    if fk_table != table:
+                        continue
+                    name = NAMING_CONVENTION['fk'] % {
+                        'table_name': table, 'column_0_name': column, 'referred_table_name': referred}
+                    batch_op.drop_constraint(name, type_='foreignkey')
+                    batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+        _sqlite_overlap_triggers()
+        return
+
+    # Postgres names the constraints itself, and the genre tables' names date
+    # from their _new tables, so look them up rather than assume
+    inspector = sa.inspect(bind)
+    for table, column, referred in FOREIGN_KEYS:
+        for fk in inspector.get_foreign_keys(table):
+            if fk['constrained_columns'] == [column] and fk['referred_table'] == referred:
+                op.drop_constraint(fk['name'], table, type_='foreignkey')
+        op.create_foreign_key(f'{table}_{column}_fkey', table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
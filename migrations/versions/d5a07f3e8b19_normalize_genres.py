@@ -0,0 +1,73 @@
+"""normalize genres
+
+Revision ID: d5a07f3e8b19
+Revises: b24e91c7d3a8
+Create Date: 2026-10-18 12:41:37.092364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a07f3e8b19'
+down_revision = 'b24e91c7d3a8'
+branch_labels = None
+depends_on = None
+
+# The genre choices the forms offered before they were read from this table
+GENRES = [
+    'Alternative', 'Blues', 'Classical', 'Country', 'Electronic', 'Folk', 'Funk',
+    'Hip-Hop', 'Heavy Metal', 'Instrumental', 'Jazz', 'Musical Theatre', 'Pop',
+    'Punk', 'R&B', 'Reggae', 'Rock n Roll', 'Soul', 'Other',
+]
+
+OWNERS = ('venue', 'artist')
+
+
+def upgrade():
+    genre = op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=35), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.bulk_insert(genre, [{'name': name} for name in GENRES])
+
+    # Rebuild each association table keyed by (owner, genre) instead of one
+    # free-text row per genre, dropping duplicate and empty rows on the way
+    for owner in OWNERS:
+        op.execute(f"INSERT INTO genre (name) "
+                   f"SELECT DISTINCT genre FROM {owner}_genre "
+                   f"WHERE genre IS NOT NULL AND genre NOT IN (SELECT name FROM genre)")
+        op.create_table(f'{owner}_genre_new',
+        sa.Column(f'{owner}_id', sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([f'{owner}_id'], [f'{owner}.id']),
+        sa.ForeignKeyConstraint(['genre_id'], ['genre.id']),
+        sa.PrimaryKeyConstraint(f'{owner}_id', 'genre_id')
+        )
+        op.execute(f"INSERT INTO {owner}_genre_new ({owner}_id, genre_id) "
+                   f"SELECT DISTINCT old.{owner}_id, genre.id FROM {owner}_genre old "
+                   f"JOIN genre ON genre.name = old.genre")
+        op.drop_table(f'{owner}_genre')
+        op.rename_table(f'{owner}_genre_new', f'{owner}_genre')
+        op.create_index(f'ix_{owner}_genre_genre_id_{owner}_id', f'{owner}_genre', ['genre_id', f'{owner}_id'], unique=False)
+
+
+def downgrade():
+    for owner in OWNERS:
+        op.create_table(f'{owner}_genre_old',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('genre', sa.String(length=35), nullable=True),
+        sa.Column(f'{owner}_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([f'{owner}_id'], [f'{owner}.id']),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.execute(f"INSERT INTO {owner}_genre_old (genre, {owner}_id) "
+                   f"SELECT genre.name, new.{owner}_id FROM {owner}_genre new "
+                   f"JOIN genre ON genre.id = new.genre_id")
+        op.drop_index(f'ix_{owner}_genre_genre_id_{owner}_id', table_name=f'{owner}_genre')
+        op.drop_table(f'{owner}_genre')
+        op.rename_table(f'{owner}_genre_old', f'{owner}_genre')
+    op.drop_table('genre')
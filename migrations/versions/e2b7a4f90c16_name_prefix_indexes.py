@@ -0,0 +1,35 @@
+"""name prefix indexes for typeahead lookups
+
+Revision ID: e2b7a4f90c16
+Revises: c4e8f2a61d93
+Create Date: 2026-10-18 20:14:36.207851
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import online_migrations as online
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7a4f90c16'
+down_revision = 'c4e8f2a61d93'
+branch_labels = None
+depends_on = None
+
+TABLES = ('venue', 'artist')
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        if dialect == 'postgresql':
+            # "C" collation, so a prefix's names form one contiguous range
+            online.create_index(f'ix_{table}_name_prefix', table, ['(lower(name)) COLLATE "C"', 'id'])
+        else:
+            online.create_index(f'ix_{table}_name_prefix', table, ['lower(name)', 'id'])
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_name_prefix')
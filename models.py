@@ -1,8 +1,24 @@
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
-db = SQLAlchemy()
+@event.listens_for(Engine, 'connect')
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite enforces foreign keys, ON DELETE CASCADE included, only on
+    # connections that ask for it
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
 
 class Venue(db.Model):
+    __table_args__ = (
+        # Serves the /venues area listing: distinct areas and venues in area order
+        db.Index('ix_venue_state_city_name', 'state', 'city', 'name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(), nullable=False)
     city = db.Column(db.String(120), nullable=False)
@@ -13,10 +29,18 @@ class Venue(db.Model):
     website_link = db.Column(db.String(500), nullable=True)
     seeking_talent = db.Column(db.Boolean(), default=False)
     seeking_description = db.Column(db.String(500), nullable=True)
-    genres = db.relationship('VenueGenre', backref='venue', cascade='all, delete-orphan')
-    shows = db.relationship('Show', backref='venueForShows', cascade='all, delete-orphan')
+    # Maintained by counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Genre and show rows go with the venue through ON DELETE CASCADE (purge.py)
+    genres = db.relationship('VenueGenre', backref='venue', cascade='all, delete-orphan', passive_deletes=True)
+    shows = db.relationship('Show', backref='venueForShows', cascade='all, delete-orphan', passive_deletes=True)
 
 class Artist(db.Model):
+    __table_args__ = (
+        # Keyset pagination of /artists
+        db.Index('ix_artist_name_id', 'name', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(), nullable=False)
     city = db.Column(db.String(120), nullable=False)
@@ -27,29 +51,64 @@ class Artist(db.Model):
     website_link = db.Column(db.String(500), nullable=True)
     seeking_venue = db.Column(db.Boolean(), default=False)
     seeking_description = db.Column(db.String(500), nullable=True)
-    genres = db.relationship('ArtistGenre', backref='artist', cascade='all, delete-orphan')
-    shows = db.relationship('Show', backref='artistForShows', cascade='all, delete-orphan')
+    # Maintained by counters.py
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    genres = db.relationship('ArtistGenre', backref='artist', cascade='all, delete-orphan', passive_deletes=True)
+    shows = db.relationship('Show', backref='artistForShows', cascade='all, delete-orphan', passive_deletes=True)
     
     def __repr__(self) -> str:
       return f'<artist {self.id} {self.name}>'
       
+class Genre(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(35), nullable=False, unique=True)
+
+    def __repr__(self) -> str:
+      return f'<genre {self.id} {self.name}>'
+
 class ArtistGenre(db.Model):
     __tablename__ = 'artist_genre'
-    id = db.Column(db.Integer, primary_key=True)
-    genre = db.Column(db.String(35))
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
-      
+    __table_args__ = (
+        # Browse artists by genre; the primary key covers lookups by artist
+        db.Index('ix_artist_genre_genre_id_artist_id', 'genre_id', 'artist_id'),
+    )
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True)
+    genre_id = db.Column(db.Integer, db.ForeignKey('genre.id'), primary_key=True)
+    genre = db.relationship('Genre')
+
 class VenueGenre(db.Model):
     __tablename__ = 'venue_genre'
-    id = db.Column(db.Integer, primary_key=True)
-    genre = db.Column(db.String(35))
-    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
-    
+    __table_args__ = (
+        # Browse venues by genre; the primary key covers lookups by venue
+        db.Index('ix_venue_genre_genre_id_venue_id', 'genre_id', 'venue_id'),
+    )
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True)
+    genre_id = db.Column(db.Integer, db.ForeignKey('genre.id'), primary_key=True)
+    genre = db.relationship('Genre')
+
 class Show(db.Model):
+    __table_args__ = (
+        # Keyset pagination of /shows
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+        # Per-venue/per-artist upcoming and past splits and recounts
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.CheckConstraint('end_time > start_time', name='ck_show_end_time'),
+        # Double bookings are rejected by constraints installed in scheduling.py
+    )
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime, nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
-    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), nullable=False)
     
     def __repr__(self) -> str:
       return f'<show {self.id} {self.start_time}>'
+
+class VersionStamp(db.Model):
+    # Bumped by writers; read routes derive their ETag from these (versions.py)
+    __tablename__ = 'version_stamp'
+    key = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    modified_at = db.Column(db.DateTime, nullable=False)
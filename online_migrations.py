@@ -0,0 +1,270 @@
+import json
+import time
+
+from alembic import context, op
+import sqlalchemy as sa
+
+# Schema changes for large tables, for use in migration scripts.
+#
+# By default the helpers behave like plain Alembic operations, inside the
+# migration's transaction. Run modes are chosen with Alembic's -x arguments:
+#
+#   flask db upgrade -x online=1 [-x batch_size=10000] [-x pause=0.1] [-x lock_timeout=5s]
+#       Postgres builds indexes CONCURRENTLY, and new columns are backfilled
+#       in primary-key batches that commit one at a time, pausing between
+#       them. NOT NULL and CHECK constraints are added NOT VALID and then
+#       validated, which does not block reads or writes. DDL waits at most
+#       lock_timeout for its lock instead of queueing other queries behind it.
+#       Every helper can be rerun: an interrupted upgrade picks up where it
+#       stopped. Some statements have no lock-light form, such as adding an
+#       exclusion constraint (add_exclusion_constraint); they run as they are
+#       and the report marks them BLOCKING, as does execute(..., blocking=...).
+#
+#   flask db upgrade -x dry_run=1
+#       The migrations run in one transaction that is rolled back. The
+#       helpers skip their expensive steps and report how many rows each
+#       would touch. Statements run without these helpers still execute,
+#       inside the rolled-back transaction.
+#
+# Each helper records a step; env.py prints the timing report at the end.
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_PAUSE = 0.0
+DEFAULT_LOCK_TIMEOUT = '5s'
+
+_steps = []
+
+
+def settings():
+    args = context.get_x_argument(as_dictionary=True)
+    return {
+        'online': args.get('online') == '1',
+        'dry_run': args.get('dry_run') == '1',
+        'batch_size': int(args.get('batch_size', DEFAULT_BATCH_SIZE)),
+        'pause': float(args.get('pause', DEFAULT_PAUSE)),
+        'lock_timeout': args.get('lock_timeout', DEFAULT_LOCK_TIMEOUT),
+    }
+
+def _dialect():
+    return op.get_bind().dialect.name
+
+def _for_dialect(sql):
+    # sql is a statement, or a mapping of dialect name to statement
+    return sql[_dialect()] if isinstance(sql, dict) else sql
+
+def _record(name, seconds, rows=None, estimate=None, note=''):
+    step = {'step': name, 'seconds': seconds, 'rows': rows, 'estimate': estimate, 'note': note}
+    _steps.append(step)
+    print(f'  {name}: {_describe(step)}')
+
+def _describe(step):
+    parts = [f"{step['seconds']:.2f}s"]
+    if step['rows'] is not None:
+        parts.append(f"{step['rows']:,} rows")
+    if step['estimate'] is not None:
+        parts.append(f"~{step['estimate']:,} rows estimated")
+    if step['note']:
+        parts.append(step['note'])
+    return ', '.join(parts)
+
+def report():
+    # Lines of the timing report for the steps run so far
+    if not _steps:
+        return []
+    width = max(len(step['step']) for step in _steps)
+    lines = [f"{'step'.ljust(width)}  {'seconds':>9}  {'rows':>12}  {'estimate':>12}  note"]
+    for step in _steps:
+        lines.append(f"{step['step'].ljust(width)}  {step['seconds']:>9.2f}  "
+                     f"{'' if step['rows'] is None else format(step['rows'], ','):>12}  "
+                     f"{'' if step['estimate'] is None else format(step['estimate'], ','):>12}  {step['note']}")
+    total = sum(step['seconds'] for step in _steps)
+    lines.append(f"{'total'.ljust(width)}  {total:>9.2f}")
+    return lines
+
+def estimate_rows(table, where=None):
+    # Rows in table matching where: the planner's estimate on Postgres, an
+    # exact count elsewhere
+    bind = op.get_bind()
+    query = f'SELECT 1 FROM "{table}"' + (f' WHERE {where}' if where else '')
+    if bind.dialect.name == 'postgresql':
+        plan = bind.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {query}').scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return int(plan[0]['Plan']['Plan Rows'])
+    return bind.exec_driver_sql(f'SELECT count(*) FROM ({query})').scalar()
+
+def _set_lock_timeout(config):
+    if config['online'] and _dialect() == 'postgresql':
+        op.execute(f"SET lock_timeout = '{config['lock_timeout']}'")
+
+
+def _constraint_exists(name, table):
+    # Postgres only
+    return op.get_bind().execute(sa.text(
+        'SELECT 1 FROM pg_constraint WHERE conname = :name AND conrelid = to_regclass(:table)'),
+        {'name': name, 'table': f'"{table}"'}).scalar() is not None
+
+
+def add_column(table, column):
+    # Adds a nullable column unless it exists; backfill it, then
+    # set_not_null() if it must be NOT NULL
+    start = time.monotonic()
+    if column.name in {c['name'] for c in sa.inspect(op.get_bind()).get_columns(table)}:
+        _record(f'add column {table}.{column.name}', time.monotonic() - start, note='already present')
+        return
+    config = settings()
+    _set_lock_timeout(config)
+    op.add_column(table, column)
+    _record(f'add column {table}.{column.name}', time.monotonic() - start,
+            note='rolled back' if config['dry_run'] else '')
+
+def backfill(table, column, expression, key='id'):
+    # Sets column to expression (SQL, or a mapping per dialect) wherever it
+    # is NULL. Online, one committed batch of key values at a time.
+    config = settings()
+    expression = _for_dialect(expression)
+    name = f'backfill {table}.{column}'
+    pending = f'{column} IS NULL'
+    start = time.monotonic()
+    if config['dry_run']:
+        _record(name, time.monotonic() - start, estimate=estimate_rows(table, pending), note='skipped')
+        return
+    if not config['online']:
+        rows = op.get_bind().exec_driver_sql(f'UPDATE "{table}" SET {column} = {expression} WHERE {pending}').rowcount
+        _record(name, time.monotonic() - start, rows=rows)
+        return
+
+    # Colons in the expression are not bind parameters
+    escaped = expression.replace(':', '\\:')
+    rows = 0
+    last = None
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        while True:
+            after = '' if last is None else f'{key} > :last AND '
+            keys = bind.execute(sa.text(
+                f'SELECT {key} FROM "{table}" WHERE {after}{pending} ORDER BY {key} LIMIT :limit'),
+                {'last': last, 'limit': config['batch_size']}).scalars().all()
+            if not keys:
+                break
+            # Each statement commits on its own; an interrupted backfill
+            # resumes from the rows still NULL
+            rows += bind.execute(sa.text(
+                f'UPDATE "{table}" SET {column} = {escaped} WHERE {key} BETWEEN :low AND :high AND {pending}'),
+                {'low': keys[0], 'high': keys[-1]}).rowcount
+            last = keys[-1]
+            print(f'    {name}: {rows:,} rows, through {key} {last}')
+            if config['pause']:
+                time.sleep(config['pause'])
+    _record(name, time.monotonic() - start, rows=rows,
+            note=f"batches of {config['batch_size']:,}, {config['pause']}s apart")
+
+def create_index(name, table, columns, unique=False, using=None):
+    # columns are SQL: column names or expressions
+    config = settings()
+    start = time.monotonic()
+    if config['dry_run']:
+        _record(f'create index {name}', time.monotonic() - start, estimate=estimate_rows(table), note='skipped')
+        return
+    definition = f'{name} ON "{table}"' + (f' USING {using}' if using else '') + f" ({', '.join(columns)})"
+    unique = 'UNIQUE ' if unique else ''
+    if not (config['online'] and _dialect() == 'postgresql'):
+        op.execute(f'CREATE {unique}INDEX IF NOT EXISTS {definition}')
+        _record(f'create index {name}', time.monotonic() - start)
+        return
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        _set_lock_timeout(config)
+        # A concurrent build that failed leaves an invalid index behind
+        invalid = bind.execute(sa.text(
+            'SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)'), {'name': name}).scalar()
+        if invalid:
+            bind.exec_driver_sql(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+        bind.exec_driver_sql(f'CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {definition}')
+    _record(f'create index {name}', time.monotonic() - start, note='concurrently')
+
+def add_check_constraint(name, table, condition):
+    config = settings()
+    start = time.monotonic()
+    if config['dry_run']:
+        _record(f'add check {name}', time.monotonic() - start, estimate=estimate_rows(table), note='skipped')
+        return
+    if _dialect() != 'postgresql':
+        # SQLite rebuilds the table
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.create_check_constraint(name, condition)
+        _record(f'add check {name}', time.monotonic() - start)
+        return
+    if not config['online']:
+        op.create_check_constraint(name, table, condition)
+        _record(f'add check {name}', time.monotonic() - start)
+        return
+
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        _set_lock_timeout(config)
+        if not _constraint_exists(name, table):
+            # Only new rows are checked while the constraint is NOT VALID
+            bind.exec_driver_sql(f'ALTER TABLE "{table}" ADD CONSTRAINT {name} CHECK ({condition}) NOT VALID')
+        # Scans the table without blocking reads or writes
+        bind.exec_driver_sql(f'ALTER TABLE "{table}" VALIDATE CONSTRAINT {name}')
+    _record(f'add check {name}', time.monotonic() - start, note='not valid, then validated')
+
+def add_exclusion_constraint(name, table, elements, using='gist'):
+    # Postgres only. There is no NOT VALID or concurrent form: the index
+    # behind the constraint is built under ACCESS EXCLUSIVE, online or not.
+    # Skipped when the constraint exists, e.g. from an interrupted run or one
+    # added by hand in a quiet period.
+    config = settings()
+    step = f'add exclusion {name}'
+    note = f'BLOCKING: holds ACCESS EXCLUSIVE on {table} throughout'
+    start = time.monotonic()
+    if config['dry_run']:
+        _record(step, time.monotonic() - start, estimate=estimate_rows(table), note=f'skipped; {note}')
+        return
+    if _constraint_exists(name, table):
+        _record(step, time.monotonic() - start, note='already present')
+        return
+    _set_lock_timeout(config)
+    op.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT {name} EXCLUDE USING {using} ({elements})')
+    _record(step, time.monotonic() - start, note=note)
+
+def set_not_null(table, column, existing_type):
+    config = settings()
+    name = f'set not null {table}.{column}'
+    start = time.monotonic()
+    if config['dry_run']:
+        _record(name, time.monotonic() - start, estimate=estimate_rows(table), note='skipped')
+        return
+    if _dialect() != 'postgresql' or not config['online']:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, existing_type=existing_type, nullable=False)
+        _record(name, time.monotonic() - start)
+        return
+
+    # A validated CHECK (column IS NOT NULL) lets SET NOT NULL skip its scan
+    check = f'ck_{table}_{column}_not_null'
+    add_check_constraint(check, table, f'{column} IS NOT NULL')
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        _set_lock_timeout(config)
+        bind.exec_driver_sql(f'ALTER TABLE "{table}" ALTER COLUMN {column} SET NOT NULL')
+        bind.exec_driver_sql(f'ALTER TABLE "{table}" DROP CONSTRAINT IF EXISTS {check}')
+    _record(name, time.monotonic() - start, note='via validated check')
+
+def execute(sql, table, blocking=None):
+    # A statement over table that the helpers above do not cover; timed, and
+    # skipped in a dry run. blocking names the lock it holds while it scans
+    # or builds, for statements online mode cannot make lock-light; the
+    # report flags those steps.
+    config = settings()
+    name = f'execute on {table}'
+    note = f'BLOCKING: holds {blocking} on {table} throughout' if blocking else ''
+    start = time.monotonic()
+    if config['dry_run']:
+        _record(name, time.monotonic() - start, estimate=estimate_rows(table),
+                note=f'skipped; {note}' if note else 'skipped')
+        return
+    _set_lock_timeout(config)
+    op.execute(_for_dialect(sql))
+    _record(name, time.monotonic() - start, note=note)
@@ -0,0 +1,86 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, tuple_
+
+# Keyset (cursor) pagination.
+#
+# A page is addressed by the sort key of the row just outside it rather than
+# by an offset: ?after=<cursor> continues forwards from a row, ?before=<cursor>
+# steps back from one. With an index on the sort columns each page is a single
+# index range scan however deep into the listing it is.
+
+
+def encode_cursor(values):
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    # Anything that does not decode to one value per sort column starts over
+    # from the first page
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return tuple(
+            datetime.fromisoformat(value) if isinstance(column.type, DateTime) else value
+            for column, value in zip(columns, values)
+        )
+    except (ValueError, TypeError):
+        return None
+
+
+class Page:
+    def __init__(self, items, next_key=None, prev_key=None):
+        self.items = items
+        self.next_cursor = encode_cursor(next_key) if next_key is not None else None
+        self.prev_cursor = encode_cursor(prev_key) if prev_key is not None else None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_query(query, columns, per_page, after=None, before=None):
+    # Returns the query restricted to one page plus one look-ahead row, and
+    # whether it walks backwards (in which case rows come back in reverse)
+    after = decode_cursor(after, columns)
+    before = decode_cursor(before, columns) if after is None else None
+    key = tuple_(*columns)
+    if before is not None:
+        query = query.filter(key < before).order_by(*[column.desc() for column in columns])
+    else:
+        if after is not None:
+            query = query.filter(key > after)
+        query = query.order_by(*columns)
+    return query.limit(per_page + 1), before is not None, after is not None
+
+def paginate(query, columns, per_page, after=None, before=None, fetch=None):
+    # columns are added to the selected entities so each row carries its key;
+    # fetch runs the final query (Query.all by default)
+    labels = [f'_keyset_{index}' for index in range(len(columns))]
+    query = query.add_columns(*[column.label(label) for column, label in zip(columns, labels)])
+    query, backwards, from_cursor = keyset_query(query, columns, per_page, after, before)
+    rows = fetch(query) if fetch is not None else query.all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    if not rows:
+        return Page(rows)
+
+    def key_of(row):
+        return tuple(row._mapping[label] for label in labels)
+
+    has_next = more if not backwards else True
+    has_prev = more if backwards else from_cursor
+    return Page(rows,
+                next_key=key_of(rows[-1]) if has_next else None,
+                prev_key=key_of(rows[0]) if has_prev else None)
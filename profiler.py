@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Opt-in per-request SQL instrumentation.
+#
+# When SQL_PROFILER is enabled every statement issued while handling a
+# request is counted and timed against that request's endpoint. Statements
+# slower than SLOW_QUERY_THRESHOLD_MS are logged together with their query
+# plan, and the aggregated per-endpoint numbers are kept for the admin stats
+# endpoint.
+
+EXPLAIN_PREFIX = {
+    'postgresql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+
+class SQLProfiler:
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {
+            'requests': 0,
+            'queries': 0,
+            'max_queries': 0,
+            'db_time_ms': 0.0,
+            'request_time_ms': 0.0,
+            'slow_queries': 0,
+        })
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_PROFILER', False)
+        app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', 100)
+        app.config.setdefault('SQL_PROFILER_ADMIN_TOKEN', None)
+        app.extensions['sql_profiler'] = self
+        self.app = app
+        if not app.config['SQL_PROFILER']:
+            return
+
+        # Listening on the Engine class covers every engine the app creates,
+        # including binds added after this point
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Engine, 'handle_error', self._handle_error)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    @property
+    def enabled(self):
+        return self.app is not None and self.app.config['SQL_PROFILER']
+
+    def _start_request(self):
+        g.sql_queries = 0
+        g.sql_time = 0.0
+        g.sql_slow_queries = 0
+        g.request_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        if 'request_started' not in g:
+            return response
+        request_time = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or request.path
+        with self._lock:
+            stats = self._stats[endpoint]
+            stats['requests'] += 1
+            stats['queries'] += g.sql_queries
+            stats['max_queries'] = max(stats['max_queries'], g.sql_queries)
+            stats['db_time_ms'] += g.sql_time * 1000
+            stats['request_time_ms'] += request_time * 1000
+            stats['slow_queries'] += g.sql_slow_queries
+        response.headers['Server-Timing'] = \
+            f'db;dur={g.sql_time * 1000:.1f};desc="{g.sql_queries} queries"'
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start_time'].pop()
+        if not has_request_context() or 'request_started' not in g:
+            return
+        g.sql_queries += 1
+        g.sql_time += elapsed
+
+        if elapsed * 1000 >= self.app.config['SLOW_QUERY_THRESHOLD_MS']:
+            g.sql_slow_queries += 1
+            plan = None if executemany else self._explain(conn, cursor, statement, parameters)
+            self.app.logger.warning(
+                'Slow query (%.1f ms) in %s: %s\nparameters: %r\nplan:\n%s',
+                elapsed * 1000, request.endpoint, statement, parameters, plan or '(unavailable)')
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its
+        # start time so later statements pair with their own
+        conn = exception_context.connection
+        if conn is not None and exception_context.execution_context is not None and conn.info.get('query_start_time'):
+            conn.info['query_start_time'].pop()
+
+    def _explain(self, conn, cursor, statement, parameters):
+        prefix = EXPLAIN_PREFIX.get(conn.dialect.name)
+        if prefix is None or not statement.lstrip().upper().startswith('SELECT'):
+            return None
+        # A raw DBAPI cursor keeps the EXPLAIN out of these event hooks
+        try:
+            explain_cursor = cursor.connection.cursor()
+            try:
+                explain_cursor.execute(prefix + statement, parameters)
+                return '\n'.join(' '.join(str(value) for value in row) for row in explain_cursor.fetchall())
+            finally:
+                explain_cursor.close()
+        except Exception as e:
+            return f'(EXPLAIN failed: {e})'
+
+    def stats(self):
+        with self._lock:
+            endpoints = {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
+        for stats in endpoints.values():
+            stats['avg_queries'] = stats['queries'] / stats['requests']
+            stats['avg_db_time_ms'] = stats['db_time_ms'] / stats['requests']
+            stats['avg_request_time_ms'] = stats['request_time_ms'] / stats['requests']
+        return dict(sorted(endpoints.items(), key=lambda item: item[1]['db_time_ms'], reverse=True))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
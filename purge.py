@@ -0,0 +1,78 @@
+from sqlalchemy import delete, select
+import counters
+import versions
+from models import Venue, Artist, Show
+
+# Deleting venues and artists.
+#
+# Show and genre rows go with their venue or artist through ON DELETE CASCADE,
+# so a delete is one statement and the ORM never loads the children. An
+# entity with more than batch_size shows first has them removed batch by
+# batch, one transaction each, so no transaction holds locks on all of them;
+# the final delete cascades over the rest. The other side's counters are
+# recounted as its shows go.
+
+# model -> (its key on show, the other owner, the other owner's key on show)
+OWNERS = {
+    Venue: (Show.venue_id, Artist, Show.artist_id),
+    Artist: (Show.artist_id, Venue, Show.venue_id),
+}
+
+
+def _kind(model):
+    return model.__tablename__
+
+def _forget_shows(conn, model, entity_id, other_ids):
+    # Recount the other owners and return the stamp keys the delete affects
+    _, other, _ = OWNERS[model]
+    if other_ids:
+        counters.refresh_counts(conn, other, other_ids)
+    keys = ['shows', f'{_kind(model)}:{entity_id}', *[f'{_kind(other)}:{other_id}' for other_id in other_ids]]
+    versions.bump(conn, *keys)
+    return keys
+
+def delete_show_batch(conn, model, entity_id, batch_size):
+    # Removes up to batch_size of the entity's shows; returns the stamp keys
+    # affected, or None once it has no shows left
+    fk, _, other_fk = OWNERS[model]
+    rows = conn.execute(select(Show.id, other_fk).where(fk == entity_id).limit(batch_size)).all()
+    if not rows:
+        return None
+    conn.execute(delete(Show.__table__).where(Show.id.in_([row[0] for row in rows])))
+    return _forget_shows(conn, model, entity_id, {row[1] for row in rows})
+
+def delete_entity(conn, model, entity_id):
+    # One DELETE, cascading to shows and genres; returns the stamp keys
+    # affected, or None if there was no such entity
+    fk, _, other_fk = OWNERS[model]
+    other_ids = set(conn.execute(select(other_fk).where(fk == entity_id).distinct()).scalars())
+    table = model.__table__
+    if conn.execute(delete(table).where(table.c.id == entity_id)).rowcount == 0:
+        return None
+    return [f'{_kind(model)}s', *_forget_shows(conn, model, entity_id, other_ids)]
+
+def purge(session, model, entity_id, batch_size, echo=None, committed=None):
+    # Deletes the entity, committing after each batch of shows and after the
+    # final delete; returns the affected stamp keys, or None if not found.
+    # committed, if given, is called with each commit's stamp keys, so caches
+    # drop what is already gone even if a later batch fails.
+    keys = set()
+    removed = 0
+    while True:
+        batch = delete_show_batch(session, model, entity_id, batch_size)
+        if batch is None:
+            break
+        session.commit()
+        if committed:
+            committed(batch)
+        keys.update(batch)
+        removed += batch_size
+        if echo:
+            echo(f'{_kind(model)} {entity_id}: removed up to {removed} shows')
+    final = delete_entity(session, model, entity_id)
+    session.commit()
+    if final is None:
+        return None
+    if committed:
+        committed(final)
+    return sorted(keys.union(final))
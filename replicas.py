@@ -0,0 +1,82 @@
+import time
+from functools import wraps
+
+from flask import g, has_app_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Read-replica routing.
+#
+# With DATABASE_REPLICA_URL set, the replica is registered as the 'replica'
+# bind. Views wrapped in ReplicaRouter.reads run their queries on it; all other
+# views, flushes and CLI commands use the primary. A request that writes pins
+# its client to the primary for REPLICA_STICKY_SECONDS, through a timestamp in
+# the session cookie, so the pages it visits next show its own changes even
+# while the replica lags.
+
+REPLICA_BIND = 'replica'
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('db_replica'):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_write(db_session, flush_context):
+    if has_app_context():
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_statement_write(orm_execute_state):
+    # Core INSERT, UPDATE and DELETE run through the session, such as show
+    # scheduling and purges, write without flushing
+    if has_app_context() and (orm_execute_state.is_insert or orm_execute_state.is_update
+                              or orm_execute_state.is_delete):
+        g.db_wrote = True
+
+
+class ReplicaRouter:
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sticky_seconds = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {})
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', 10)
+        app.before_request(self._reset)
+        app.after_request(self._pin_after_write)
+        app.extensions['replica_router'] = self
+
+    def pinned(self):
+        return session.get('db_primary_until', 0) > time.time()
+
+    def reads(self, view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.enabled:
+                if self.pinned():
+                    # Pages cached from replica reads may predate this
+                    # client's write; see PageCache.cached
+                    g.db_primary = True
+                else:
+                    g.db_replica = True
+            return view(*args, **kwargs)
+        return wrapper
+
+    def _reset(self):
+        # g outlives the request when the app context was pushed up front
+        for flag in ('db_replica', 'db_primary', 'db_wrote'):
+            g.pop(flag, None)
+
+    def _pin_after_write(self, response):
+        if self.enabled and g.get('db_wrote'):
+            session['db_primary_until'] = time.time() + self.sticky_seconds
+        return response
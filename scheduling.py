@@ -0,0 +1,119 @@
+from datetime import timedelta
+from itertools import islice
+
+from dateutil.rrule import rrulestr
+from sqlalchemy import DDL, event, insert
+from sqlalchemy.exc import IntegrityError
+import counters
+import versions
+from models import Show
+
+# Show scheduling: one show, a batch, or a recurrence rule at a time.
+#
+# A show occupies its venue and its artist over [start_time, end_time). The
+# database rejects double bookings itself, so a batch is written as one
+# multi-row INSERT with no lookup of existing shows beforehand:
+#  - Postgres: exclusion constraints over (venue_id / artist_id, time range),
+#    backed by GiST indexes (btree_gist supplies the integer equality)
+#  - SQLite: BEFORE INSERT/UPDATE triggers probing (owner_id, end_time)
+#    indexes for a show that ends after the new one starts
+
+DEFAULT_DURATION = timedelta(hours=3)
+# Most shows one request may create
+BATCH_LIMIT = 500
+
+OWNERS = ('venue', 'artist')
+
+
+def _postgres_ddl(owner):
+    return [
+        'CREATE EXTENSION IF NOT EXISTS btree_gist',
+        f'ALTER TABLE "show" ADD CONSTRAINT ex_show_{owner}_overlap EXCLUDE USING gist '
+        f'({owner}_id WITH =, tsrange(start_time, end_time) WITH &&)',
+    ]
+
+def _sqlite_ddl(owner):
+    overlap = (f'SELECT RAISE(ABORT, \'ex_show_{owner}_overlap\') FROM "show" '
+               f'WHERE {owner}_id = NEW.{owner}_id AND end_time > NEW.start_time AND start_time < NEW.end_time')
+    return [
+        f'CREATE INDEX IF NOT EXISTS ix_show_{owner}_id_end_time ON "show" ({owner}_id, end_time)',
+        f'CREATE TRIGGER IF NOT EXISTS ex_show_{owner}_overlap_insert BEFORE INSERT ON "show" '
+        f'BEGIN {overlap}; END',
+        f'CREATE TRIGGER IF NOT EXISTS ex_show_{owner}_overlap_update '
+        f'BEFORE UPDATE OF {owner}_id, start_time, end_time ON "show" '
+        f'BEGIN {overlap} AND id != NEW.id; END',
+    ]
+
+# Migrations install these on existing databases; the listeners cover
+# databases built with db.create_all()
+for _owner in OWNERS:
+    for _statement in _postgres_ddl(_owner):
+        event.listen(Show.__table__, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+    for _statement in _sqlite_ddl(_owner):
+        event.listen(Show.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+
+class SchedulingError(Exception):
+    pass
+
+class ShowConflict(SchedulingError):
+    def __init__(self, owner):
+        super().__init__(f'the {owner} already has a show at an overlapping time')
+        self.owner = owner
+
+
+def conflict_owner(error):
+    # 'venue' or 'artist' when an IntegrityError is a double booking
+    message = str(getattr(error, 'orig', error))
+    for owner in OWNERS:
+        if f'ex_show_{owner}_overlap' in message:
+            return owner
+    return None
+
+def _foreign_key_violation(error):
+    # SQLite: 'FOREIGN KEY constraint failed'; Postgres: '... violates
+    # foreign key constraint ...'
+    return 'foreign key constraint' in str(getattr(error, 'orig', error)).lower()
+
+def occurrences(start_time, rule=None, limit=BATCH_LIMIT):
+    # Start times of a show and its repeats, given an RFC 5545 RRULE such as
+    # 'FREQ=WEEKLY;COUNT=12' or 'FREQ=DAILY;UNTIL=20301231T000000'
+    if not rule:
+        return [start_time]
+    try:
+        starts = list(islice(rrulestr(rule, dtstart=start_time), limit + 1))
+    except (ValueError, TypeError) as e:
+        raise SchedulingError(f'invalid recurrence rule: {e}') from None
+    if len(starts) > limit:
+        raise SchedulingError(f'a recurrence may create at most {limit} shows')
+    return starts
+
+def schedule(conn, shows):
+    # shows are mappings with venue_id, artist_id, start_time and optionally
+    # end_time; all are inserted by one statement or none are
+    rows = [{
+        'venue_id': int(show['venue_id']),
+        'artist_id': int(show['artist_id']),
+        'start_time': show['start_time'],
+        'end_time': show.get('end_time') or show['start_time'] + DEFAULT_DURATION,
+    } for show in shows]
+    if not rows:
+        raise SchedulingError('no shows to schedule')
+    if len(rows) > BATCH_LIMIT:
+        raise SchedulingError(f'at most {BATCH_LIMIT} shows may be scheduled at once')
+    if any(row['end_time'] <= row['start_time'] for row in rows):
+        raise SchedulingError('a show must end after it starts')
+    try:
+        conn.execute(insert(Show.__table__).values(rows))
+    except IntegrityError as e:
+        owner = conflict_owner(e)
+        if owner is not None:
+            raise ShowConflict(owner) from None
+        if _foreign_key_violation(e):
+            raise SchedulingError('unknown venue or artist') from None
+        raise
+    counters.add_shows(conn, rows)
+    versions.bump(conn, 'shows',
+                  *{f"venue:{row['venue_id']}" for row in rows},
+                  *{f"artist:{row['artist_id']}" for row in rows})
+    return rows
@@ -0,0 +1,121 @@
+import sys
+
+from sqlalchemy import DDL, column, event, func, table
+from models import db, Venue, Artist
+
+# Name search is served from an index on every backend we run on:
+#  - Postgres: a pg_trgm GIN index, which ILIKE '%term%' and similarity() use
+#  - SQLite: an FTS5 trigram table kept in sync with the base table by triggers
+#
+# Typeahead lookups match a name prefix instead, as a range scan over an index
+# on (lower(name), id) that also returns the hits in order. On Postgres the
+# index uses the "C" collation, in which the range holds exactly the names
+# with the prefix; SQLite compares bytes already.
+
+def _postgres_ddl(tablename):
+    return [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE INDEX IF NOT EXISTS ix_{tablename}_name_trgm ON {tablename} USING gin (name gin_trgm_ops)',
+        f'CREATE INDEX IF NOT EXISTS ix_{tablename}_name_prefix ON {tablename} ((lower(name)) COLLATE "C", id)',
+    ]
+
+def _sqlite_ddl(tablename):
+    fts = f'{tablename}_name_fts'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(name, content='{tablename}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tablename} BEGIN "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tablename} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF name ON {tablename} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, name) VALUES ('delete', old.id, old.name); "
+        f"INSERT INTO {fts}(rowid, name) VALUES (new.id, new.name); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+        f'CREATE INDEX IF NOT EXISTS ix_{tablename}_name_prefix ON {tablename} (lower(name), id)',
+    ]
+
+# Migrations install these on existing databases; the listeners cover
+# databases built with db.create_all()
+for _model in (Venue, Artist):
+    _tablename = _model.__tablename__
+    for _statement in _postgres_ddl(_tablename):
+        event.listen(_model.__table__, 'after_create', DDL(_statement).execute_if(dialect='postgresql'))
+    for _statement in _sqlite_ddl(_tablename):
+        event.listen(_model.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+    event.listen(_model.__table__, 'before_drop',
+                 DDL(f'DROP TABLE IF EXISTS {_tablename}_name_fts').execute_if(dialect='sqlite'))
+
+
+def _like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+def _search(model, term, limit, fetch=None):
+    term = term.strip()
+    dialect = db.session.get_bind().dialect.name
+
+    # The total match count comes back with the page of hits; upcoming show
+    # counts are read from the maintained counter column
+    query = db.session.query(
+        model.id,
+        model.name,
+        model.upcoming_shows_count.label('num_upcoming_shows'),
+        func.count().over().label('total')
+    )
+
+    if not term:
+        query = query.order_by(model.name, model.id)
+    elif dialect == 'postgresql':
+        query = query.filter(model.name.ilike(_like_pattern(term), escape='\\')) \
+            .order_by(func.similarity(model.name, term).desc(), model.name, model.id)
+    elif dialect == 'sqlite' and len(term) >= 3:
+        # The trigram tokenizer needs at least three characters to match
+        fts = table(f'{model.__tablename__}_name_fts', column('rowid'), column('name'), column('rank'))
+        phrase = '"' + term.replace('"', '""') + '"'
+        query = query.join(fts, fts.c.rowid == model.id) \
+            .filter(fts.c.name.op('MATCH')(phrase)) \
+            .order_by(fts.c.rank, model.name, model.id)
+    else:
+        query = query.filter(model.name.ilike(_like_pattern(term), escape='\\')) \
+            .order_by(model.name, model.id)
+
+    query = query.limit(limit)
+    return fetch(query) if fetch is not None else query.all()
+
+def find_venues(term, limit, fetch=None):
+    return _search(Venue, term, limit, fetch)
+
+def find_artists(term, limit, fetch=None):
+    return _search(Artist, term, limit, fetch)
+
+def _prefix_bound(prefix):
+    # The least string above every string that starts with prefix, or None
+    # when there is none
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else None
+
+def _suggest(model, prefix, limit, fetch=None):
+    prefix = prefix.strip()
+    key = func.lower(model.name)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        key = key.collate('C')
+        prefix = prefix.lower()
+    else:
+        # SQLite's lower() folds ASCII letters only
+        prefix = ''.join(c.lower() if c.isascii() else c for c in prefix)
+
+    query = db.session.query(model.id, model.name).order_by(key, model.id)
+    if prefix:
+        query = query.filter(key >= prefix)
+        bound = _prefix_bound(prefix)
+        if bound is not None:
+            query = query.filter(key < bound)
+
+    query = query.limit(limit)
+    return fetch(query) if fetch is not None else query.all()
+
+def suggest_venues(prefix, limit, fetch=None):
+    return _suggest(Venue, prefix, limit, fetch)
+
+def suggest_artists(prefix, limit, fetch=None):
+    return _suggest(Artist, prefix, limit, fetch)
@@ -2,3 +2,45 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Name autocomplete for inputs with data-typeahead: suggestions come from the
+// JSON lookup at that URL and fill the input's datalist; picking one stores
+// its id in the hidden field named by data-typeahead-target.
+$(function () {
+  $('input[data-typeahead]').each(function () {
+    var input = this;
+    var $input = $(input);
+    var $target = $('#' + $input.data('typeahead-target'));
+    var $list = $('#' + $input.attr('list'));
+    var ids = {};
+    var timer = null;
+
+    function select() {
+      var id = ids[input.value];
+      $target.val(id === undefined ? '' : id);
+      input.setCustomValidity(id === undefined && input.value ? $input.data('typeahead-missing') : '');
+    }
+
+    $input.on('input', function () {
+      select();
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        $.getJSON($input.data('typeahead'), { q: input.value }, function (response) {
+          var counts = {};
+          $.each(response.data, function (i, item) {
+            counts[item.name] = (counts[item.name] || 0) + 1;
+          });
+          ids = {};
+          $list.empty();
+          $.each(response.data, function (i, item) {
+            // Tell apart entities sharing a name by their id
+            var value = counts[item.name] > 1 ? item.name + ' (#' + item.id + ')' : item.name;
+            ids[value] = item.id;
+            $list.append($('<option>').attr('value', value));
+          });
+          select();
+        });
+      }, 150);
+    });
+  });
+});
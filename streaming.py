@@ -0,0 +1,32 @@
+from flask import Response, stream_template
+
+# Streamed listing pages.
+#
+# With STREAM_LISTINGS on, the listing views hand the template an iterator
+# over a server-side cursor (yield_per) instead of a list, and the response is
+# sent as the template renders. Time to first byte no longer depends on the
+# catalog size, and at most one batch of rows is held in memory.
+
+CHUNK_SIZE = 16 * 1024
+
+
+def stream_rows(query, batch_size):
+    # yield_per fetches batch_size rows at a time and, on Postgres, runs the
+    # statement on a server-side (named) cursor
+    return query.yield_per(batch_size)
+
+def _coalesce(fragments, size):
+    # Jinja yields many tiny fragments; join them into socket-sized chunks
+    buffer, length = [], 0
+    for fragment in fragments:
+        buffer.append(fragment)
+        length += len(fragment)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+def stream_page(template_name, **context):
+    return Response(_coalesce(stream_template(template_name, **context), CHUNK_SIZE),
+                    mimetype='text/html')
@@ -0,0 +1,57 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+# The app reads its configuration when imported, so the database is chosen
+# first: a SQLite file in a temporary directory, registered as the replica
+# too so read routing and primary pinning are exercised
+_directory = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f'sqlite:///{_directory}/fyyur.db'
+os.environ['DATABASE_REPLICA_URL'] = os.environ['DATABASE_URL']
+os.environ.pop('SQLITE_TUNED', None)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    from helpers import GENRES
+    from models import db, Genre
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    db.create_all()
+    db.session.add_all(Genre(name=name) for name in GENRES)
+    db.session.commit()
+    yield app
+    db.session.remove()
+    db.drop_all()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def venue(app):
+    from helpers import entity
+    from models import Venue
+    return entity(Venue, 'Test Venue')
+
+@pytest.fixture
+def artist(app):
+    from helpers import entity
+    from models import Artist
+    return entity(Artist, 'Test Artist')
+
+@pytest.fixture
+def add_shows(app):
+    # add_shows(venue_id, artist_id, count): count non-overlapping shows,
+    # half of them past and half upcoming
+    import scheduling
+    from models import db
+
+    def add(venue_id, artist_id, count):
+        start = datetime.now().replace(microsecond=0) - timedelta(days=count // 2)
+        scheduling.schedule(db.session, [{'venue_id': venue_id, 'artist_id': artist_id,
+                                          'start_time': start + timedelta(days=i)} for i in range(count)])
+        db.session.commit()
+    return add
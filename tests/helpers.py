@@ -0,0 +1,20 @@
+from models import db
+
+GENRES = ['Blues', 'Jazz', 'Rock n Roll']
+
+
+def entity(model, name, **columns):
+    # Adds a venue or artist with the required columns filled; returns its id
+    record = model(name=name, city='City 1', state='CA', phone='555-555-5555', **columns)
+    db.session.add(record)
+    db.session.commit()
+    return record.id
+
+def entity_form(name, **fields):
+    # A valid venue or artist form submission, with fields overriding it
+    return {
+        'name': name, 'city': 'City 1', 'state': 'CA', 'address': '1 Main St',
+        'phone': '555-555-5555', 'genres': GENRES[:2], 'facebook_link': 'https://www.facebook.com/test',
+        'image_link': '', 'website_link': '', 'seeking_talent': 'False', 'seeking_venue': 'False',
+        'seeking_description': '', **fields,
+    }
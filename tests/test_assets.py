@@ -0,0 +1,10 @@
+from assets import minify_css
+
+
+def test_minify_css_keeps_license_banners():
+    banner = '/*!\n * Bootstrap v3.4.1 (https://getbootstrap.com/)\n * Licensed under MIT\n */'
+    css = f'{banner}\n/* a note */\nbody {{\n  color: red;\n  margin: 0;\n}}\n'
+    minified = minify_css(css)
+    assert minified.startswith(banner)
+    assert 'a note' not in minified
+    assert minified.endswith('body{color: red;margin: 0}')
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+import versions
+from models import db
+
+
+def _bump(*keys):
+    versions.bump(db.session, *keys)
+    db.session.commit()
+
+def test_etag_revalidation(client, venue):
+    etag = client.get(f'/venues/{venue}').headers['ETag']
+    assert client.get(f'/venues/{venue}', headers={'If-None-Match': etag}).status_code == 304
+    _bump(f'venue:{venue}')
+    assert client.get(f'/venues/{venue}', headers={'If-None-Match': etag}).status_code == 200
+
+def test_if_modified_since_revalidation(client, venue, monkeypatch):
+    _bump(f'venue:{venue}', 'artists')
+    last_modified = client.get(f'/venues/{venue}').headers['Last-Modified']
+    assert client.get(f'/venues/{venue}', headers={'If-Modified-Since': last_modified}).status_code == 304
+    # A write in a later second
+    later = versions._utcnow() + timedelta(seconds=2)
+    monkeypatch.setattr(versions, '_utcnow', lambda: later)
+    _bump(f'venue:{venue}')
+    assert client.get(f'/venues/{venue}', headers={'If-Modified-Since': last_modified}).status_code == 200
+
+def test_etag_changes_with_render_settings(app, client, monkeypatch):
+    etag = client.get('/venues').headers['ETag']
+    monkeypatch.setitem(app.config, 'STREAM_LISTINGS', not app.config['STREAM_LISTINGS'])
+    response = client.get('/venues', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from helpers import entity
+from models import Venue, Artist
+
+# A detail page runs a fixed number of statements however many shows its
+# venue or artist has: the version stamp lookup, the entity with its genres
+# and its shows. A per-show query would make the count grow with them.
+MAX_QUERIES = 3
+SHOWS = 12
+
+
+@pytest.fixture
+def statements(app):
+    executed = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    event.listen(Engine, 'before_cursor_execute', count)
+    yield executed
+    event.remove(Engine, 'before_cursor_execute', count)
+
+def _queries(client, statements, path):
+    statements.clear()
+    response = client.get(path)
+    assert response.status_code == 200
+    return len(statements)
+
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_detail_page_queries_do_not_grow_with_shows(client, statements, add_shows, kind):
+    pages = {}
+    for count in (0, SHOWS):
+        venue = entity(Venue, f'Venue with {count} shows')
+        artist = entity(Artist, f'Artist with {count} shows')
+        if count:
+            add_shows(venue, artist, count)
+        entity_id = venue if kind == 'venue' else artist
+        pages[count] = _queries(client, statements, f'/{kind}s/{entity_id}')
+    assert pages[0] == pages[SHOWS]
+    assert pages[SHOWS] <= MAX_QUERIES
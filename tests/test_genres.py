@@ -0,0 +1,17 @@
+import importer
+from helpers import entity_form
+from models import db, Venue
+
+
+def test_genres_added_by_an_import_are_picked_up(client):
+    assert client.get('/genres/Blues/venues').status_code == 200
+    assert client.get('/genres/Polka/venues').status_code == 404
+    # As flask import-data adds genres the lookup table lacks
+    with db.engine.begin() as conn:
+        importer.GenreResolver().resolve(conn, {'Polka'})
+    assert client.get('/genres/Polka/venues').status_code == 200
+    assert client.get('/genres/Polka/artists').status_code == 200
+    assert b'Polka' in client.get('/venues/create').data
+    client.post('/venues/create', data=entity_form('Polka Venue', genres=['Polka']))
+    venue = db.session.query(Venue).filter_by(name='Polka Venue').one()
+    assert [genre.genre.name for genre in venue.genres] == ['Polka']
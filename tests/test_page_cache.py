@@ -0,0 +1,22 @@
+from sqlalchemy import update
+
+import app as fyyur
+import versions
+from models import db, Venue
+
+
+def test_write_from_another_process_misses_the_page_cache(client, venue):
+    assert b'Test Venue' in client.get(f'/venues/{venue}').data
+    # As a CLI command or another worker would: commit and bump the stamps,
+    # with no page_cache.invalidate() in this process
+    db.session.execute(update(Venue).where(Venue.id == venue).values(name='Renamed Venue'))
+    versions.bump(db.session, f'venue:{venue}')
+    db.session.commit()
+    assert b'Renamed Venue' in client.get(f'/venues/{venue}').data
+
+def test_unchanged_page_is_served_from_the_cache(client, venue, monkeypatch):
+    client.get(f'/venues/{venue}')
+    rendered = []
+    monkeypatch.setattr(fyyur, 'render_template', lambda *args, **kwargs: rendered.append(args) or '')
+    assert client.get(f'/venues/{venue}').status_code == 200
+    assert rendered == []
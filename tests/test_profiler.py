@@ -0,0 +1,28 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from models import db
+from profiler import SQLProfiler
+
+
+@pytest.fixture
+def profiler(app):
+    profiling = Flask(__name__)
+    profiling.config['SQL_PROFILER'] = True
+    profiler = SQLProfiler(profiling)
+    yield profiler
+    for name, listener in (('before_cursor_execute', profiler._before_cursor_execute),
+                           ('after_cursor_execute', profiler._after_cursor_execute),
+                           ('handle_error', profiler._handle_error)):
+        event.remove(Engine, name, listener)
+
+def test_failed_statements_do_not_leak_start_times(profiler):
+    with db.engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql('SELECT * FROM no_such_table')
+        conn.exec_driver_sql('SELECT 1')
+        assert conn.info.get('query_start_time') == []
@@ -0,0 +1,25 @@
+import app as fyyur
+import purge
+
+
+def test_failed_purge_still_invalidates_committed_batches(client, venue, artist, add_shows, monkeypatch):
+    add_shows(venue, artist, 3)
+    invalidated = []
+    monkeypatch.setitem(fyyur.app.config, 'PURGE_BATCH_SIZE', 1)
+    monkeypatch.setattr(fyyur.page_cache, 'invalidate', lambda *keys: invalidated.append(set(keys)))
+
+    def fail(*args):
+        raise RuntimeError('final delete failed')
+    monkeypatch.setattr(purge, 'delete_entity', fail)
+
+    client.get(f'/venues/delete/{venue}')
+    assert len(invalidated) == 3
+    assert all({'shows', f'venue:{venue}', f'artist:{artist}'} <= keys for keys in invalidated)
+
+def test_purge_reports_every_commit(app, venue, artist, add_shows):
+    add_shows(venue, artist, 3)
+    commits = []
+    keys = purge.purge(fyyur.db.session, fyyur.Venue, venue, 2, committed=commits.append)
+    assert len(commits) == 3
+    assert 'venues' in commits[-1]
+    assert set(keys) == set().union(*commits)
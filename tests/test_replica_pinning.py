@@ -0,0 +1,41 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from helpers import entity_form
+
+# Every write route pins its client to the primary, whether it writes through
+# an ORM flush or a Core statement on the session
+
+def _start(days):
+    return (datetime.now() + timedelta(days=days)).replace(hour=9, minute=0, second=0, microsecond=0).isoformat()
+
+WRITES = {
+    'create_venue': lambda venue, artist: ('post', '/venues/create', {'data': entity_form('New Venue')}),
+    'create_artist': lambda venue, artist: ('post', '/artists/create', {'data': entity_form('New Artist')}),
+    'edit_venue': lambda venue, artist: ('post', f'/venues/{venue}/edit', {'data': entity_form('Edited Venue')}),
+    'edit_artist': lambda venue, artist: ('post', f'/artists/{artist}/edit', {'data': entity_form('Edited Artist')}),
+    'create_show': lambda venue, artist: ('post', '/shows/create', {'data': {
+        'venue_id': venue, 'artist_id': artist, 'start_time': _start(10), 'duration': 60}}),
+    'schedule_shows': lambda venue, artist: ('post', '/api/shows', {'json': {
+        'venue_id': venue, 'artist_id': artist, 'start_time': _start(20)}}),
+    'delete_venue': lambda venue, artist: ('get', f'/venues/delete/{venue}', {}),
+    'delete_artist': lambda venue, artist: ('get', f'/artists/delete/{artist}', {}),
+}
+
+
+def _pinned(client):
+    with client.session_transaction() as session:
+        return session.get('db_primary_until', 0) > time.time()
+
+@pytest.mark.parametrize('route', sorted(WRITES))
+def test_write_pins_client_to_primary(client, venue, artist, route):
+    method, path, kwargs = WRITES[route](venue, artist)
+    response = getattr(client, method)(path, **kwargs)
+    assert response.status_code < 400
+    assert _pinned(client)
+
+def test_read_does_not_pin(client, venue):
+    assert client.get(f'/venues/{venue}').status_code == 200
+    assert not _pinned(client)
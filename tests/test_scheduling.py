@@ -0,0 +1,22 @@
+from datetime import datetime, timedelta
+
+from models import db, Show
+
+
+def _start(days):
+    return (datetime.now() + timedelta(days=days)).replace(hour=9, minute=0, second=0, microsecond=0).isoformat()
+
+def test_unknown_venue_or_artist_is_a_client_error(client, venue, artist):
+    for body in ({'venue_id': 99999, 'artist_id': artist, 'start_time': _start(5)},
+                 {'shows': [{'venue_id': venue, 'artist_id': 99999, 'start_time': _start(6)}]}):
+        response = client.post('/api/shows', json=body)
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'unknown venue or artist'
+    assert db.session.query(Show).filter(Show.venue_id == venue).count() == 0
+
+def test_double_booking_is_a_conflict(client, venue, artist):
+    body = {'venue_id': venue, 'artist_id': artist, 'start_time': _start(7)}
+    assert client.post('/api/shows', json=body).status_code == 201
+    response = client.post('/api/shows', json=body)
+    assert response.status_code == 409
+    assert response.get_json()['conflict'] in ('venue', 'artist')
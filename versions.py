@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, VersionStamp
+
+# Conditional GET for the read routes.
+#
+# Every page depends on a few version stamps: table-wide ones ('venues',
+# 'artists', 'shows') and per-entity ones ('venue:3', 'artist:7'). Writers bump
+# the stamps they affect inside their own transaction (bump). A read route
+# fetches its stamps with one primary-key lookup and derives a strong ETag and
+# a Last-Modified from them, answering If-None-Match / If-Modified-Since with
+# a 304 before any of the page's own queries run.
+
+# Settings that change what the read routes render, so a deployment that
+# changes one gets new ETags even with the same code and stamps
+PAGE_SETTINGS = ('STREAM_LISTINGS', 'AREAS_PER_PAGE', 'PAGE_SIZE', 'FACET_VALUES_SHOWN')
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _dialect_name(conn):
+    dialect = getattr(conn, 'dialect', None) or conn.get_bind().dialect
+    return dialect.name
+
+def bump(conn, *keys):
+    # Sorted so concurrent writers lock stamp rows in the same order
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    now = _utcnow()
+    table = VersionStamp.__table__
+    dialect = _dialect_name(conn)
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        # Batched to stay under bound-parameter limits on large imports
+        for start in range(0, len(keys), 1000):
+            statement = insert(table).values(
+                [{'key': key, 'version': 1, 'modified_at': now} for key in keys[start:start + 1000]])
+            conn.execute(statement.on_conflict_do_update(
+                index_elements=[table.c.key],
+                set_={'version': table.c.version + 1, 'modified_at': statement.excluded.modified_at}))
+    else:
+        conn.execute(update(table).where(table.c.key.in_(keys))
+                     .values(version=table.c.version + 1, modified_at=now))
+        existing = set(conn.execute(select(table.c.key).where(table.c.key.in_(keys))).scalars())
+        missing = [{'key': key, 'version': 1, 'modified_at': now} for key in keys if key not in existing]
+        if missing:
+            conn.execute(table.insert(), missing)
+
+
+class ConditionalGet:
+    def __init__(self, app=None):
+        self.build_id = ''
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # Rendered output also changes when templates or code are deployed
+        digest = hashlib.sha1()
+        for folder, extensions in ((app.root_path, ('.py',)),
+                                   (os.path.join(app.root_path, app.template_folder), ('.html',))):
+            for directory, _, files in sorted(os.walk(folder)):
+                if folder == app.root_path and directory != folder:
+                    continue
+                for name in sorted(files):
+                    if name.endswith(extensions):
+                        with open(os.path.join(directory, name), 'rb') as f:
+                            digest.update(f.read())
+        # and when rebuilt asset bundles change the URLs pages link to
+        assets = app.extensions.get('assets')
+        if assets is not None:
+            digest.update(json.dumps(assets.manifest, sort_keys=True).encode())
+        self.build_id = digest.hexdigest()[:12]
+        app.extensions['conditional_get'] = self
+
+    def validators(self, keys):
+        rows = db.session.execute(
+            select(VersionStamp.key, VersionStamp.version, VersionStamp.modified_at)
+            .where(VersionStamp.key.in_(keys))).all()
+        stamps = {row.key: row.version for row in rows}
+        modified = max((row.modified_at for row in rows), default=None)
+        versions = ';'.join(f'{key}={stamps.get(key, 0)}' for key in sorted(keys))
+        settings = json.dumps([current_app.config.get(name) for name in PAGE_SETTINGS])
+        etag = hashlib.sha1(f'{self.build_id}|{settings}|{versions}'.encode()).hexdigest()
+        return etag, modified
+
+    def conditional(self, keys):
+        # keys is a callable taking the view arguments and returning stamp keys
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Pages carrying flashed messages are per-user
+                if session.get('_flashes'):
+                    return view(*args, **kwargs)
+
+                etag, modified = self.validators(keys(**kwargs))
+                # Part of the page cache key, so a bump made by any process,
+                # CLI commands included, misses pages cached before it
+                g.page_etag = etag
+                if request.if_none_match:
+                    not_modified = request.if_none_match.contains(etag)
+                else:
+                    # HTTP dates are whole seconds, so modified_at is compared
+                    # as sent in Last-Modified. A later write in the same
+                    # second is only told apart by the ETag.
+                    not_modified = (modified is not None and request.if_modified_since is not None
+                                    and modified.replace(microsecond=0, tzinfo=timezone.utc)
+                                    <= request.if_modified_since)
+                if not_modified:
+                    response = make_response('', 304)
+                else:
+                    try:
+                        response = make_response(view(*args, **kwargs))
+                    finally:
+                        g.pop('page_etag', None)
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag)
+                if modified is not None:
+                    response.last_modified = modified.replace(microsecond=0, tzinfo=timezone.utc)
+                # Let browsers keep the page but revalidate it on every use
+                response.cache_control.no_cache = True
+                return response
+            return wrapper
+        return decorator